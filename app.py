@@ -2,7 +2,7 @@ import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
-from recommender import load_data, build_vectorizer, search_movie, find_similar_movies, clean_title
+from recommender import RecommenderEngine
 
 # Page Config - No sidebar
 st.set_page_config(
@@ -170,30 +170,14 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# Load data with caching
-@st.cache_data(ttl=3600)
-def load_app_data():
-    """Load data (local CSVs or auto-download from GroupLens) and add clean_title column."""
-    try:
-        movies, ratings = load_data(auto_download=True)
-        movies = movies.copy()
-        movies["clean_title"] = movies["title"].apply(clean_title)
-        return movies, ratings
-    except Exception as e:
-        st.error(f"Error loading data: {e}")
-        return None, None
+# Load everything once per process; sessions share the engine without copies
+@st.cache_resource
+def get_engine():
+    """Load data (local CSVs or auto-download from GroupLens) and build the search and CF indexes.
 
-@st.cache_data(ttl=3600)
-def vectorize_data(movies_df):
-    """Build TF-IDF vectorizer"""
-    try:
-        if "clean_title" not in movies_df.columns:
-            return None, None
-        vectorizer, vectors = build_vectorizer(movies_df["clean_title"])
-        return vectorizer, vectors
-    except Exception as e:
-        st.error(f"Error vectorizing data: {e}")
-        return None, None
+    Raises on failure: st.cache_resource does not cache exceptions, so the next rerun retries.
+    """
+    return RecommenderEngine.load(auto_download=True)
 
 # Header
 col1, col2, col3 = st.columns([1, 2, 1])
@@ -202,17 +186,13 @@ with col2:
     st.markdown('<p class="subtitle">Discover Movies You\'ll Love ✨</p>', unsafe_allow_html=True)
 
 # Main content
-movies, ratings = load_app_data()
-
-if movies is None or ratings is None:
-    st.error("Failed to load data. Please check your CSV files.")
+try:
+    engine = get_engine()
+except Exception as e:
+    st.error(f"Error loading data: {e}. Please check your CSV files.")
     st.stop()
 
-# Load vectorizer
-vectorizer, vectors = vectorize_data(movies)
-if vectorizer is None or vectors is None:
-    st.error("Failed to vectorize data.")
-    st.stop()
+movies = engine.movies
 
 # Tabs for different modes
 tab1, tab2 = st.tabs(["🎯 Search & Discover", "⭐ Browse Top Movies"])
@@ -226,6 +206,9 @@ with tab1:
     
     with col1:
         query = st.text_input("🎬 Movie Title", placeholder="e.g., The Matrix, Inception...")
+        hints = engine.suggest(query, k=5) if query else []
+        if hints:
+            st.caption("💡 " + " · ".join(hints))
     
     with col2:
         min_score = st.slider("📊 Similarity Threshold", 0.0, 1.0, 0.2, 0.05)
@@ -233,6 +216,7 @@ with tab1:
     with col3:
         top_n = st.slider("🔢 Results to Show", 1, 15, 8)
     
+    fuzzy = st.checkbox("✏️ Typo-tolerant matching", value=False)
     search_btn = st.button("🔍 Search", use_container_width=True, key="search_btn")
     
     # Search logic
@@ -244,7 +228,7 @@ with tab1:
             
             # Search for matches
             with st.spinner("🎬 Searching for movies..."):
-                matches = search_movie(query, movies, vectorizer, vectors, top_n=top_n, min_score=min_score)
+                matches = engine.search(query, top_n=top_n, min_score=min_score, mode="fuzzy" if fuzzy else "tfidf")
             
             if matches.empty:
                 col1, col2, col3 = st.columns(3)
@@ -283,7 +267,7 @@ with tab1:
                     
                     # Get recommendations
                     with st.spinner(f"✨ Finding recommendations for '{selected_title}'..."):
-                        recs = find_similar_movies(selected_movie_id, movies, ratings)
+                        recs = engine.similar(selected_movie_id)
                     
                     if recs.empty:
                         st.info(f"ℹ️ No strong recommendations found for '{selected_title}'. Try another movie!")
@@ -386,7 +370,7 @@ with tab2:
                 selected_title = movie['title']
                 
                 with st.spinner(f"✨ Finding recommendations for '{selected_title}'..."):
-                    recs = find_similar_movies(selected_movie_id, movies, ratings)
+                    recs = engine.similar(selected_movie_id)
                 
                 if recs.empty:
                     st.warning(f"No recommendations for {selected_title}")
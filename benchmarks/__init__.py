@@ -0,0 +1 @@
+"""Benchmark harness for the recommender hot paths (python -m benchmarks.run)."""
@@ -0,0 +1,257 @@
+"""
+Benchmark the recommender hot paths on synthetic MovieLens-shaped data.
+
+    python -m benchmarks.run --sizes 100k 1m --output bench.json
+    python -m benchmarks.run --sizes 100k 1m --baseline bench.json
+
+Times load_data, build_vectorizer, search_movie over a query mix and find_similar_movies
+for popular, median and long-tail seeds; reports p50/p95/p99 latency, throughput and peak
+RSS per size as JSON. Each size runs in a fresh process so peak RSS is its own.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import scipy
+import sklearn
+
+import recommender
+from recommender import (
+    CooccurrenceIndex,
+    TitleIndex,
+    TrigramIndex,
+    build_vectorizer,
+    clean_titles,
+    find_similar_movies,
+    load_data,
+    search_movie,
+)
+from benchmarks.synthetic import SIZES, generate
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATA_DIR = os.path.join(REPO_DIR, "benchmarks", "data")
+_YEAR_RE = re.compile(r"\s*\(\d{4}\)\s*$")
+_LETTERS = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far, in MiB (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux but bytes on macOS.
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+def _timed(fn: Callable[[], object], n: int) -> List[float]:
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _summary(samples: List[float], rows: Optional[int] = None) -> Dict[str, float]:
+    """Latency percentiles (ms) and throughput for one stage's samples (seconds)."""
+    arr = np.asarray(samples)
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99]) * 1000
+    total = float(arr.sum())
+    out = {
+        "n": int(arr.size),
+        "p50_ms": round(float(p50), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+        "mean_ms": round(float(arr.mean()) * 1000, 4),
+        "throughput_per_s": round(arr.size / total, 3) if total > 0 else None,
+    }
+    if rows is not None:
+        out["rows_per_s"] = round(rows * arr.size / total, 1) if total > 0 else None
+    out["peak_rss_mb"] = _peak_rss_mb()
+    return out
+
+
+def make_queries(movies: pd.DataFrame, n: int, rng: np.random.Generator) -> Dict[str, List[str]]:
+    """n queries of each kind: exact title, one/two-word partial, one-letter typo and no-match."""
+    titles = movies["title"].astype(str).str.replace(_YEAR_RE, "", regex=True).to_numpy()
+    picked = titles[rng.integers(0, titles.size, n)]
+    partial, typo = [], []
+    for title in picked:
+        words = title.split()
+        start = rng.integers(0, len(words))
+        partial.append(" ".join(words[start:start + rng.integers(1, 3)]))
+        # Replace one letter of the longest word, the way a fast typist would.
+        longest = max(range(len(words)), key=lambda i: len(words[i]))
+        word = words[longest]
+        pos = rng.integers(1, len(word)) if len(word) > 1 else 0
+        words[longest] = word[:pos] + rng.choice(_LETTERS) + word[pos + 1:]
+        typo.append(" ".join(words))
+    miss = ["".join(rng.choice(_LETTERS, 9)) for _ in range(n)]
+    return {"exact": list(picked), "partial": partial, "typo": typo, "miss": miss}
+
+
+def pick_seeds(ratings: pd.DataFrame, n: int) -> Dict[str, np.ndarray]:
+    """n movieIds each from the most liked, the median and the least liked (but liked) movies."""
+    liked = ratings.loc[ratings["rating"] >= CooccurrenceIndex.LIKED_THRESHOLD, "movieId"]
+    ids = liked.value_counts(sort=False).sort_index(kind="stable")
+    ids = ids.index.to_numpy()[np.argsort(-ids.to_numpy(), kind="stable")]
+    mid = max(0, ids.size // 2 - n // 2)
+    return {"popular": ids[:n], "median": ids[mid:mid + n], "long_tail": ids[-n:]}
+
+
+def bench_size(
+    movies_path: str, ratings_path: str, repeat: int = 3, n_queries: int = 200, n_seeds: int = 50, seed: int = 0
+) -> Dict[str, object]:
+    """Run every stage against one dataset and return its stats."""
+    rng = np.random.default_rng(seed)
+    stages: Dict[str, Dict[str, float]] = {}
+
+    movies, ratings = load_data(movies_path, ratings_path, auto_download=False, cache=False)
+    n_rows = len(ratings)
+    stages["load_data.csv"] = _summary(
+        _timed(lambda: load_data(movies_path, ratings_path, auto_download=False, cache=False), repeat), n_rows
+    )
+    load_data(movies_path, ratings_path, auto_download=False)  # writes the .cache/ columns
+    stages["load_data.cached"] = _summary(
+        _timed(lambda: load_data(movies_path, ratings_path, auto_download=False), repeat), n_rows
+    )
+
+    corpus = clean_titles(movies["title"])
+    stages["build_vectorizer"] = _summary(_timed(lambda: build_vectorizer(corpus), repeat), len(movies))
+    vectorizer, vectors = build_vectorizer(corpus)
+    movies = movies.assign(clean_title=corpus)
+    title_index = TitleIndex(vectorizer, vectors)
+    fuzzy_index = TrigramIndex(corpus)
+
+    queries = make_queries(movies, n_queries, rng)
+    mix = [q for kind in queries.values() for q in kind]
+    rng.shuffle(mix)
+    searches = {
+        "search_movie.scan": (mix, {}),
+        "search_movie.indexed": (mix, {"index": title_index}),
+        "search_movie.fuzzy": (mix, {"mode": "fuzzy", "fuzzy_index": fuzzy_index}),
+    }
+    searches.update({f"search_movie.indexed.{kind}": (qs, {"index": title_index}) for kind, qs in queries.items()})
+    for name, (qs, kwargs) in searches.items():
+        search_movie(qs[0], movies, vectorizer, vectors, **kwargs)
+        samples = [_timed(lambda q=q: search_movie(q, movies, vectorizer, vectors, **kwargs), 1)[0] for q in qs]
+        stages[name] = _summary(samples)
+
+    stages["cooccurrence_index.build"] = _summary(_timed(lambda: CooccurrenceIndex.from_ratings(ratings), repeat))
+    index = CooccurrenceIndex.from_ratings(ratings)
+    for kind, seeds in pick_seeds(ratings, n_seeds).items():
+        find_similar_movies(int(seeds[0]), movies, ratings, index=index)
+        samples = [
+            _timed(lambda m=int(m): find_similar_movies(m, movies, ratings, index=index), 1)[0] for m in seeds
+        ]
+        stages[f"find_similar_movies.{kind}"] = _summary(samples)
+
+    return {
+        "dataset": {"ratings": n_rows, "movies": len(movies), "users": int(ratings["userId"].nunique())},
+        "stages": stages,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "describe", "--always", "--dirty"], cwd=REPO_DIR, capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def run_metadata() -> Dict[str, object]:
+    return {
+        "revision": _git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "scipy": scipy.__version__,
+        "sklearn": sklearn.__version__,
+        "recommender": os.path.relpath(recommender.__file__, REPO_DIR),
+    }
+
+
+def compare(baseline: Dict, current: Dict, tolerance: float = 0.20) -> List[str]:
+    """Stages whose p50 grew by more than tolerance relative to baseline, as printable lines."""
+    regressions = []
+    for size, result in current["sizes"].items():
+        base_stages = baseline.get("sizes", {}).get(size, {}).get("stages", {})
+        for stage, stats in result["stages"].items():
+            base = base_stages.get(stage)
+            if not base or not base["p50_ms"]:
+                continue
+            ratio = stats["p50_ms"] / base["p50_ms"]
+            if ratio > 1 + tolerance:
+                regressions.append(
+                    f"{size} {stage}: p50 {base['p50_ms']:.3f} ms -> {stats['p50_ms']:.3f} ms ({ratio:.2f}x)"
+                )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=["100k", "1m"])
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="where synthetic CSVs are generated and kept")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs of the load/build stages")
+    parser.add_argument("--queries", type=int, default=200, help="queries per kind in the search mix")
+    parser.add_argument("--seeds", type=int, default=50, help="seed movies per popularity band")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for data, queries and seeds")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    parser.add_argument("--baseline", help="earlier JSON output; exit 1 if any p50 regressed past --tolerance")
+    parser.add_argument("--tolerance", type=float, default=0.20)
+    args = parser.parse_args(argv)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    report = {"meta": run_metadata(), "sizes": {}}
+    for size in args.sizes:
+        # Generation and each benchmark get their own process so peak RSS is per size.
+        print(f"[{size}] generating data", file=sys.stderr)
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            movies_path, ratings_path = pool.submit(generate, size, args.data_dir, args.seed).result()
+        print(f"[{size}] benchmarking", file=sys.stderr)
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            report["sizes"][size] = pool.submit(
+                bench_size, movies_path, ratings_path, args.repeat, args.queries, args.seeds, args.seed
+            ).result()
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if baseline is not None:
+        regressions = compare(baseline, report, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
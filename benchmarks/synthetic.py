@@ -0,0 +1,120 @@
+"""
+Synthetic MovieLens-shaped datasets for benchmarking.
+Movie popularity is Zipf-like and user activity log-normal, like the real ratings.csv.
+"""
+import os
+from typing import Dict, NamedTuple, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class SizeSpec(NamedTuple):
+    ratings: int
+    movies: int
+    users: int
+
+
+# Movie and user counts follow the MovieLens release of roughly that size.
+SIZES: Dict[str, SizeSpec] = {
+    "100k": SizeSpec(100_000, 9_742, 610),
+    "1m": SizeSpec(1_000_000, 3_883, 6_040),
+    "10m": SizeSpec(10_000_000, 10_681, 69_878),
+    "25m": SizeSpec(25_000_000, 62_423, 162_541),
+}
+
+GENRES = (
+    "Action", "Adventure", "Animation", "Children", "Comedy", "Crime", "Documentary", "Drama",
+    "Fantasy", "Film-Noir", "Horror", "IMAX", "Musical", "Mystery", "Romance", "Sci-Fi",
+    "Thriller", "War", "Western",
+)
+_SYLLABLES = (
+    "ka", "lo", "mi", "ra", "ten", "dor", "vel", "sa", "quin", "bar", "tor", "ne", "lis", "mon",
+    "the", "gal", "ro", "zen", "fi", "cas", "tle", "mar", "pol", "den", "ver", "ash", "il", "una",
+)
+
+
+def _vocabulary(rng: np.random.Generator, size: int) -> np.ndarray:
+    """size distinct made-up words of two to three syllables."""
+    words = set()
+    while len(words) < size:
+        n = rng.integers(2, 4)
+        words.add("".join(rng.choice(_SYLLABLES, n)))
+    return np.array(sorted(words), dtype=object)
+
+
+def make_movies(n_movies: int, rng: np.random.Generator) -> pd.DataFrame:
+    """movies.csv frame: sparse increasing movieIds, "Words Words (Year)" titles, |-joined genres."""
+    movie_ids = np.sort(rng.choice(np.arange(1, 3 * n_movies + 1), n_movies, replace=False))
+    vocab = _vocabulary(rng, max(500, n_movies // 4))
+    # Zipf-distributed word choice so some title words are common, like "love" or "man".
+    word_p = 1.0 / np.arange(1, vocab.size + 1)
+    word_p /= word_p.sum()
+    lengths = rng.integers(1, 5, n_movies)
+    words = rng.choice(vocab, lengths.sum(), p=word_p)
+    bounds = np.concatenate(([0], np.cumsum(lengths)))
+    years = rng.integers(1920, 2024, n_movies)
+    titles = [
+        " ".join(w.capitalize() for w in words[bounds[i]:bounds[i + 1]]) + f" ({years[i]})"
+        for i in range(n_movies)
+    ]
+    n_genres = rng.integers(1, 4, n_movies)
+    genres = ["|".join(rng.choice(GENRES, k, replace=False)) for k in n_genres]
+    return pd.DataFrame({"movieId": movie_ids, "title": titles, "genres": genres})
+
+
+def make_ratings(
+    n_ratings: int, movie_ids: np.ndarray, n_users: int, rng: np.random.Generator, zipf_a: float = 1.0
+) -> pd.DataFrame:
+    """ratings.csv frame with Zipf movie popularity and log-normal user activity.
+
+    Users are drawn with at least 20 ratings each (as in MovieLens) before pairs are
+    deduplicated; (userId, movieId) pairs are unique and rows are sorted by userId then movieId.
+    """
+    n_movies = movie_ids.size
+    # Popularity rank is independent of movieId.
+    movie_p = 1.0 / np.arange(1, n_movies + 1) ** zipf_a
+    movie_p = movie_p[rng.permutation(n_movies)]
+    movie_p /= movie_p.sum()
+    activity = rng.lognormal(0.0, 1.2, n_users)
+    activity = np.maximum(20, np.round(activity / activity.sum() * n_ratings)).astype(np.int64)
+    activity = np.minimum(activity, n_movies // 2)
+
+    keys = np.empty(0, dtype=np.int64)
+    users = np.repeat(np.arange(n_users, dtype=np.int64), activity)
+    # Sample with replacement, drop repeated pairs and resample until n_ratings are unique.
+    while keys.size < n_ratings:
+        need = n_ratings - keys.size
+        draw_users = users if keys.size == 0 else rng.choice(users, int(need * 1.2) + 1)
+        draw = draw_users * n_movies + rng.choice(n_movies, draw_users.size, p=movie_p)
+        keys = np.unique(np.concatenate((keys, draw)))
+    keys = np.sort(rng.choice(keys, n_ratings, replace=False))
+    user, movie = np.divmod(keys, n_movies)
+
+    quality = rng.normal(3.5, 0.5, n_movies)
+    stars = np.clip(np.round((quality[movie] + rng.normal(0.0, 0.9, n_ratings)) * 2) / 2, 0.5, 5.0)
+    return pd.DataFrame({
+        "userId": (user + 1).astype(np.int64),
+        "movieId": movie_ids[movie],
+        "rating": stars,
+        "timestamp": rng.integers(789_652_009, 1_700_000_000, n_ratings),
+    })
+
+
+def generate(size: str, data_dir: str, seed: int = 0) -> Tuple[str, str]:
+    """Write movies.csv/ratings.csv for size into data_dir/size/ (reused if present)."""
+    spec = SIZES[size]
+    out = os.path.join(data_dir, size)
+    movies_path, ratings_path = os.path.join(out, "movies.csv"), os.path.join(out, "ratings.csv")
+    if os.path.exists(movies_path) and os.path.exists(ratings_path):
+        return movies_path, ratings_path
+    os.makedirs(out, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    movies = make_movies(spec.movies, rng)
+    ratings = make_ratings(spec.ratings, movies["movieId"].to_numpy(), spec.users, rng)
+    movies.to_csv(movies_path, index=False)
+    # Written last and atomically, so an interrupted run is regenerated next time.
+    tmp = ratings_path + ".tmp"
+    ratings.to_csv(tmp, index=False)
+    os.replace(tmp, ratings_path)
+    return movies_path, ratings_path
@@ -2,72 +2,528 @@
 Movie recommendation: load data, TF-IDF search, collaborative filtering.
 Uses local movies.csv/ratings.csv or auto-downloads from GroupLens.
 """
+import argparse
+import hashlib
+import json
+import math
 import os
 import re
 import shutil
+import sys
+import threading
+import time
 import unicodedata
-from typing import Optional, Tuple
+import weakref
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import repeat
+from typing import Dict, List, NamedTuple, Optional, Tuple
 import zipfile
 import urllib.request
 import tempfile
 
 import numpy as np
 import pandas as pd
+import scipy.sparse as sp
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 
 GROUPLENS_URL = "https://files.grouplens.org/datasets/movielens/ml-latest-small.zip"
 
+# Ratings count above which engines switch to compact dtypes and the memory-mapped stores.
+LARGE_DATASET_RATINGS = 5_000_000
+
+
+class DatasetSpec(NamedTuple):
+    """A MovieLens variant: where its zip comes from and where its CSVs (and caches) live."""
+
+    name: str
+    source: str
+    data_dir: Optional[str] = None
+
+
+DATASETS: Dict[str, DatasetSpec] = {
+    "ml-latest-small": DatasetSpec("ml-latest-small", GROUPLENS_URL, os.path.dirname(os.path.abspath(__file__))),
+    "ml-latest": DatasetSpec("ml-latest", "https://files.grouplens.org/datasets/movielens/ml-latest.zip"),
+    "ml-25m": DatasetSpec("ml-25m", "https://files.grouplens.org/datasets/movielens/ml-25m.zip"),
+    "ml-32m": DatasetSpec("ml-32m", "https://files.grouplens.org/datasets/movielens/ml-32m.zip"),
+}
+DEFAULT_DATASET = "ml-latest-small"
+
 
 def _data_path(filename: str) -> str:
     return os.path.join(os.path.dirname(__file__), filename)
 
 
-def _download_data(target_dir: str) -> Tuple[str, str]:
-    """Download MovieLens ml-latest-small from GroupLens; save movies.csv and ratings.csv to target_dir."""
+def register_dataset(name: str, source: str, data_dir: Optional[str] = None) -> DatasetSpec:
+    """Add or override a dataset variant; source is a zip URL or a local archive path."""
+    DATASETS[name] = DatasetSpec(name, source, data_dir)
+    return DATASETS[name]
+
+
+def get_dataset(name: Optional[str] = None) -> DatasetSpec:
+    """Look up a variant by name, defaulting to $CINEMATCH_DATASET, then ml-latest-small.
+
+    $CINEMATCH_DATASET_SOURCE overrides the variant's source. Variants without their own
+    data_dir live in $CINEMATCH_DATA_DIR/<name> (default: data/<name> beside this module),
+    which also keeps their binary caches separate.
+    """
+    name = name or os.environ.get("CINEMATCH_DATASET") or DEFAULT_DATASET
+    if name not in DATASETS:
+        raise ValueError(f"Unknown dataset {name!r}; known: {', '.join(sorted(DATASETS))}")
+    spec = DATASETS[name]
+    if spec.data_dir is None:
+        root = os.environ.get("CINEMATCH_DATA_DIR") or _data_path("data")
+        spec = spec._replace(data_dir=os.path.join(root, name))
+    source = os.environ.get("CINEMATCH_DATASET_SOURCE")
+    if source:
+        spec = spec._replace(source=source)
+    return spec
+
+
+def resolve_data_paths(
+    movies_path: Optional[str] = None,
+    ratings_path: Optional[str] = None,
+    auto_download: bool = True,
+    dataset: Optional[str] = None,
+) -> Tuple[str, str]:
+    """Paths of movies.csv and ratings.csv for a dataset, downloading them if missing."""
+    spec = get_dataset(dataset)
+    mp = movies_path or os.path.join(spec.data_dir, "movies.csv")
+    rp = ratings_path or os.path.join(spec.data_dir, "ratings.csv")
+
+    if not (os.path.exists(mp) and os.path.exists(rp)) and auto_download:
+        mp, rp = _download_data(spec.data_dir, spec.source)
+
+    if not os.path.exists(mp) or not os.path.exists(rp):
+        raise FileNotFoundError(
+            f"movies.csv and/or ratings.csv not found in {spec.data_dir}. "
+            f"Download from {spec.source} "
+            "and extract into this folder."
+        )
+    return mp, rp
+
+
+def count_ratings(ratings_path: str) -> int:
+    """Number of data rows in ratings.csv, from the binary cache when one exists."""
+    parent = os.path.join(os.path.dirname(os.path.abspath(ratings_path)), CACHE_DIRNAME)
+    prefix, suffix = os.path.basename(ratings_path) + ".", "." + _source_key(ratings_path)
+    if os.path.isdir(parent):
+        for name in os.listdir(parent):
+            meta = os.path.join(parent, name, "meta.json")
+            if name.startswith(prefix) and name.endswith(suffix) and os.path.exists(meta):
+                with open(meta) as fh:
+                    return int(json.load(fh)["rows"])
+    lines = 0
+    with open(ratings_path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 24), b""):
+            lines += block.count(b"\n")
+    return max(lines - 1, 0)
+
+
+def _download_data(target_dir: str, source: str = GROUPLENS_URL) -> Tuple[str, str]:
+    """Fetch a MovieLens zip and save movies.csv and ratings.csv to target_dir.
+
+    source is a URL (http(s)://, file://) or a local archive path. Members are streamed
+    straight from the archive into a temp file beside their destination and renamed into
+    place, so each CSV is written once and a partial extraction is never visible.
+    """
     os.makedirs(target_dir, exist_ok=True)
     movies_path = os.path.join(target_dir, "movies.csv")
     ratings_path = os.path.join(target_dir, "ratings.csv")
     if os.path.exists(movies_path) and os.path.exists(ratings_path):
         return movies_path, ratings_path
-    with tempfile.TemporaryDirectory() as tmpdir:
-        zip_path = os.path.join(tmpdir, "data.zip")
-        urllib.request.urlretrieve(GROUPLENS_URL, zip_path)
-        with zipfile.ZipFile(zip_path, "r") as zf:
-            for name in zf.namelist():
-                base = os.path.basename(name)
-                if base == "movies.csv":
-                    zf.extract(name, tmpdir)
-                    shutil.copy2(os.path.join(tmpdir, name), movies_path)
-                elif base == "ratings.csv":
-                    zf.extract(name, tmpdir)
-                    shutil.copy2(os.path.join(tmpdir, name), ratings_path)
+    if os.path.exists(source):
+        _extract_csvs(source, movies_path, ratings_path)
+    else:
+        # Zip central directories sit at the end, so the archive itself must be on disk.
+        with tempfile.TemporaryFile(dir=target_dir) as archive:
+            with urllib.request.urlopen(source) as response:
+                shutil.copyfileobj(response, archive, 1 << 20)
+            archive.seek(0)
+            _extract_csvs(archive, movies_path, ratings_path)
     if not os.path.exists(movies_path) or not os.path.exists(ratings_path):
         raise FileNotFoundError("movies.csv or ratings.csv not found in zip")
     return movies_path, ratings_path
 
 
+def _extract_csvs(archive, movies_path: str, ratings_path: str) -> None:
+    targets = {"movies.csv": movies_path, "ratings.csv": ratings_path}
+    with zipfile.ZipFile(archive, "r") as zf:
+        for name in zf.namelist():
+            dest = targets.get(os.path.basename(name))
+            if dest is not None:
+                _stream_member(zf, name, dest)
+
+
+def _current_umask() -> int:
+    mask = os.umask(0o022)
+    os.umask(mask)
+    return mask
+
+
+# Read once at import: temp files and dirs are created private (0600/0700) and are
+# chmod-ed to the usual umask-derived mode before being renamed into place.
+_UMASK = _current_umask()
+
+
+def _stream_member(zf: zipfile.ZipFile, name: str, dest: str) -> None:
+    """Decompress one archive member into dest atomically (temp file + rename)."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dest), prefix=".tmp-", suffix=".csv")
+    try:
+        with os.fdopen(fd, "wb") as out, zf.open(name) as member:
+            shutil.copyfileobj(member, out, 1 << 20)
+        os.chmod(tmp_path, 0o666 & ~_UMASK)
+        os.replace(tmp_path, dest)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
 def load_data(
     movies_path: Optional[str] = None,
     ratings_path: Optional[str] = None,
     auto_download: bool = True,
+    cache: bool = True,
+    compact: bool = False,
+    keep_timestamp: bool = True,
+    dataset: Optional[str] = None,
 ) -> Tuple[pd.DataFrame, pd.DataFrame]:
-    """Load movies and ratings. Uses local CSVs if present; otherwise downloads from GroupLens."""
-    base = os.path.dirname(__file__)
-    mp = movies_path or _data_path("movies.csv")
-    rp = ratings_path or _data_path("ratings.csv")
+    """Load movies and ratings. Uses local CSVs if present; otherwise downloads from GroupLens.
 
-    if not (os.path.exists(mp) and os.path.exists(rp)) and auto_download:
-        mp, rp = _download_data(base)
+    dataset picks a registered MovieLens variant (see get_dataset) when paths are not given.
+
+    With cache=True the parsed CSVs are kept as .npy columns under .cache/ next to them
+    (keyed on file size and mtime) and memory-mapped on later loads instead of re-parsed.
+    Numeric and bool columns of the returned frames are then read-only memory maps, so
+    in-place edits raise ValueError; take a .copy() first, or pass cache=False.
+    With compact=True ratings use int32 IDs, float16 ratings (exact for half stars) and a
+    uint32 timestamp, or no timestamp column when keep_timestamp=False.
+    """
+    mp, rp = resolve_data_paths(movies_path, ratings_path, auto_download, dataset)
+    if compact:
+        variant = "compact" if keep_timestamp else "compact-nots"
+        read_ratings = partial(_read_ratings_compact, keep_timestamp=keep_timestamp)
+    else:
+        variant, read_ratings = "raw", pd.read_csv
+    if not cache:
+        return pd.read_csv(mp), read_ratings(rp)
+    return _read_csv_cached(mp), _read_csv_cached(rp, variant, read_ratings)
+
+
+def _read_ratings_compact(path: str, keep_timestamp: bool = True) -> pd.DataFrame:
+    """Read ratings.csv with 4/4/2/4-byte columns instead of the 8-byte pandas defaults."""
+    dtypes = {"userId": np.int32, "movieId": np.int32, "rating": np.float32, "timestamp": np.uint32}
+    usecols = list(dtypes) if keep_timestamp else ["userId", "movieId", "rating"]
+    ratings = pd.read_csv(path, usecols=usecols, dtype={c: dtypes[c] for c in usecols})
+    ratings["rating"] = ratings["rating"].astype(np.float16)
+    return ratings
+
+
+CACHE_DIRNAME = ".cache"
+# Bumped when the column cache layout changes; caches in an older layout are rebuilt.
+FRAME_CACHE_VERSION = 2
+
+
+def _source_key(path: str) -> str:
+    """Cache key for a source file: size and mtime, so an edited or replaced CSV misses."""
+    st = os.stat(path)
+    return f"{st.st_size:x}-{st.st_mtime_ns:x}"
+
+
+def _frame_cache_dir(path: str, variant: str = "raw") -> str:
+    base = os.path.basename(path)
+    return os.path.join(
+        os.path.dirname(os.path.abspath(path)), CACHE_DIRNAME, f"{base}.{variant}.{_source_key(path)}"
+    )
+
+
+def _publish_dir(tmp_dir: str, dest: str) -> None:
+    """Rename a finished mkdtemp dir to dest, readable by other users as the umask allows.
+
+    If another process published dest first, its copy is kept and tmp_dir is removed.
+    """
+    try:
+        os.chmod(tmp_dir, 0o777 & ~_UMASK)
+        os.replace(tmp_dir, dest)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _write_frame_cache(df: pd.DataFrame, cache_dir: str) -> None:
+    """Write df as one .npy per column; numeric and bool columns (NaN included) are saved as
+    arrays, object/string columns as a NUL-joined UTF-8 blob plus a missing-value mask."""
+    parent = os.path.dirname(cache_dir)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent)
+    try:
+        _write_frame_columns(df, tmp_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    _publish_dir(tmp_dir, cache_dir)
+
+
+def _write_frame_columns(df: pd.DataFrame, tmp_dir: str) -> None:
+    columns = []
+    for i, col in enumerate(df.columns):
+        values = df[col]
+        if isinstance(values.dtype, np.dtype) and values.dtype.kind in "biuf":
+            np.save(os.path.join(tmp_dir, f"{i}.npy"), values.to_numpy())
+            columns.append({"name": col, "kind": "array"})
+        else:
+            missing = values.isna().to_numpy()
+            text = "\0".join(values.fillna("").astype(str))
+            np.save(os.path.join(tmp_dir, f"{i}.npy"), np.frombuffer(text.encode("utf-8"), dtype=np.uint8))
+            np.save(os.path.join(tmp_dir, f"{i}.na.npy"), missing)
+            columns.append({"name": col, "kind": "text"})
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as fh:
+        json.dump({"columns": columns, "rows": len(df), "version": FRAME_CACHE_VERSION}, fh)
+
+
+def _read_frame_cache(cache_dir: str) -> pd.DataFrame:
+    """Open a cache written by _write_frame_cache; numeric columns are memory-mapped, not copied."""
+    with open(os.path.join(cache_dir, "meta.json")) as fh:
+        meta = json.load(fh)
+    data = {}
+    for i, col in enumerate(meta["columns"]):
+        path = os.path.join(cache_dir, f"{i}.npy")
+        if col["kind"] == "array":
+            data[col["name"]] = np.load(path, mmap_mode="r")
+            continue
+        blob = np.load(path)
+        values = blob.tobytes().decode("utf-8").split("\0") if meta["rows"] else []
+        series = pd.Series(values)
+        missing = np.load(os.path.join(cache_dir, f"{i}.na.npy"))
+        if missing.any():
+            series = series.where(~missing)
+        data[col["name"]] = series
+    return pd.DataFrame(data, copy=False)
+
+
+def _read_csv_cached(path: str, variant: str = "raw", reader=pd.read_csv) -> pd.DataFrame:
+    """reader(path) backed by a binary column cache next to the CSV, one cache per variant."""
+    cache_dir = _frame_cache_dir(path, variant)
+    meta_path = os.path.join(cache_dir, "meta.json")
+    if os.path.exists(meta_path):
+        with open(meta_path) as fh:
+            if json.load(fh).get("version", 1) == FRAME_CACHE_VERSION:
+                return _read_frame_cache(cache_dir)
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    df = reader(path)
+    try:
+        _prune_frame_caches(path)
+        _write_frame_cache(df, cache_dir)
+    except OSError:
+        # Read-only data directory: serve the parsed CSV without caching.
+        return df
+    return _read_frame_cache(cache_dir)
+
+
+def _prune_frame_caches(path: str) -> None:
+    """Remove caches left behind by earlier versions of the same source file."""
+    parent = os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIRNAME)
+    if not os.path.isdir(parent):
+        return
+    prefix = os.path.basename(path) + "."
+    suffix = "." + _source_key(path)
+    for name in os.listdir(parent):
+        if name.startswith(prefix) and not name.endswith(suffix):
+            shutil.rmtree(os.path.join(parent, name), ignore_errors=True)
+
+
+class _NullTrace:
+    """What Tracer.trace returns while tracing is off: every call is a no-op."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullTrace":
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+    def mark(self, stage: str, rows: Optional[int] = None) -> None:
+        pass
+
+
+_NULL_TRACE = _NullTrace()
+
+
+class _OtelHandles(NamedTuple):
+    trace: object
+    context: object
+    tracer: object
+
+
+class Trace:
+    """Timeline of one traced call; mark(stage, rows) closes a stage at the current time."""
+
+    __slots__ = ("operation", "stages", "_tracer", "_otel", "_span", "_token", "_wall_start", "_start", "_last")
+
+    def __init__(self, tracer: "Tracer", operation: str):
+        self.operation = operation
+        self.stages: List[Tuple[str, float, Optional[int]]] = []
+        self._tracer = tracer
+        self._otel = tracer._otel
+        self._span = self._token = None
+
+    def __enter__(self) -> "Trace":
+        otel = self._otel
+        self._wall_start = time.time_ns()
+        if otel is not None:
+            # Opened up front and made current so nested traced calls become child spans.
+            self._span = otel.tracer.start_span(self.operation, start_time=self._wall_start)
+            self._token = otel.context.attach(otel.trace.set_span_in_context(self._span))
+        self._start = self._last = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        total = time.perf_counter() - self._start
+        if self._span is not None:
+            self._otel.context.detach(self._token)
+        self._tracer._finish(self, total)
+        return False
+
+    def mark(self, stage: str, rows: Optional[int] = None) -> None:
+        now = time.perf_counter()
+        self.stages.append((stage, now - self._last, rows))
+        self._last = now
 
-    if not os.path.exists(mp) or not os.path.exists(rp):
-        raise FileNotFoundError(
-            f"movies.csv and/or ratings.csv not found in {base}. "
-            "Download from https://files.grouplens.org/datasets/movielens/ml-latest-small.zip "
-            "and extract into this folder."
-        )
 
-    return pd.read_csv(mp), pd.read_csv(rp)
+class Tracer:
+    """Per-stage durations and row counts for search and CF calls; off by default.
+
+    Instrumented code runs `with TRACER.trace(operation) as t:` and calls t.mark(stage, rows)
+    after each stage. While disabled trace() hands back a shared no-op object, so the cost
+    is a method call per stage. Enabled, stages are aggregated per operation (stats(),
+    prometheus()) and the last recent_size calls are kept whole (recent()). With
+    opentelemetry=True each call is also emitted as a span with one child span per stage
+    through the globally configured OpenTelemetry tracer provider, e.g. an OTLP exporter
+    pointed at a local collector.
+    """
+
+    def __init__(self, recent_size: int = 256):
+        self.enabled = False
+        self._otel = None
+        self._lock = threading.Lock()
+        # (operation, stage) -> [calls, total seconds, max seconds, rows or None]
+        self._stats: Dict[Tuple[str, str], list] = {}
+        self._recent: deque = deque(maxlen=recent_size)
+
+    def enable(self, opentelemetry: bool = False) -> None:
+        otel = None
+        if opentelemetry:
+            try:
+                from opentelemetry import context as otel_context, trace as otel_trace
+            except ImportError as e:
+                raise ImportError("opentelemetry=True needs the opentelemetry-api package") from e
+            otel = _OtelHandles(otel_trace, otel_context, otel_trace.get_tracer("cinematch.recommender"))
+        self._otel = otel
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+        self._otel = None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self._recent.clear()
+
+    def trace(self, operation: str):
+        return Trace(self, operation) if self.enabled else _NULL_TRACE
+
+    def _finish(self, trace: Trace, total: float) -> None:
+        with self._lock:
+            for stage, seconds, rows in trace.stages + [("total", total, None)]:
+                entry = self._stats.get((trace.operation, stage))
+                if entry is None:
+                    entry = self._stats[(trace.operation, stage)] = [0, 0.0, 0.0, None]
+                entry[0] += 1
+                entry[1] += seconds
+                entry[2] = max(entry[2], seconds)
+                if rows is not None:
+                    entry[3] = (entry[3] or 0) + int(rows)
+            self._recent.append({
+                "operation": trace.operation,
+                "total_ms": total * 1000,
+                "stages": [
+                    {"stage": stage, "ms": seconds * 1000, "rows": rows} for stage, seconds, rows in trace.stages
+                ],
+            })
+        if trace._span is not None:
+            self._export(trace, total)
+
+    def _export(self, trace: Trace, total: float) -> None:
+        """Emit one child span per stage under the call's span, then end it."""
+        otel, start = trace._otel, trace._wall_start
+        context = otel.trace.set_span_in_context(trace._span)
+        offset = 0
+        for stage, seconds, rows in trace.stages:
+            span = otel.tracer.start_span(stage, context=context, start_time=start + offset)
+            if rows is not None:
+                span.set_attribute("rows", int(rows))
+            offset += int(seconds * 1e9)
+            span.end(end_time=start + offset)
+        trace._span.end(end_time=start + int(total * 1e9))
+
+    def stats(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """{operation: {stage: calls, total/mean/max ms, rows}}; "total" is the whole call."""
+        out: Dict[str, Dict[str, Dict[str, float]]] = {}
+        with self._lock:
+            for (operation, stage), (calls, total, peak, rows) in self._stats.items():
+                out.setdefault(operation, {})[stage] = {
+                    "calls": calls,
+                    "total_ms": total * 1000,
+                    "mean_ms": total * 1000 / calls,
+                    "max_ms": peak * 1000,
+                    "rows": rows,
+                }
+        return out
+
+    def recent(self) -> List[dict]:
+        """The most recent traced calls, oldest first, with their per-stage breakdown."""
+        with self._lock:
+            return list(self._recent)
+
+    def prometheus(self, prefix: str = "cinematch") -> str:
+        """stats() in the Prometheus text exposition format."""
+        with self._lock:
+            items = sorted(self._stats.items())
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent in each recommender stage.",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        for (operation, stage), (calls, total, _, _) in items:
+            labels = f'operation="{operation}",stage="{stage}"'
+            lines.append(f"{prefix}_stage_seconds_sum{{{labels}}} {total!r}")
+            lines.append(f"{prefix}_stage_seconds_count{{{labels}}} {calls}")
+        lines += [
+            f"# HELP {prefix}_stage_max_seconds Slowest observed call of each stage.",
+            f"# TYPE {prefix}_stage_max_seconds gauge",
+        ]
+        for (operation, stage), (_, _, peak, _) in items:
+            lines.append(f'{prefix}_stage_max_seconds{{operation="{operation}",stage="{stage}"}} {peak!r}')
+        lines += [
+            f"# HELP {prefix}_stage_rows_total Rows produced by each recommender stage.",
+            f"# TYPE {prefix}_stage_rows_total counter",
+        ]
+        for (operation, stage), (_, _, _, rows) in items:
+            if rows is not None:
+                lines.append(f'{prefix}_stage_rows_total{{operation="{operation}",stage="{stage}"}} {rows}')
+        return "\n".join(lines) + "\n"
+
+
+TRACER = Tracer()
+# CINEMATCH_TRACE=1 turns tracing on at import; CINEMATCH_TRACE=otel also emits OpenTelemetry spans.
+if os.environ.get("CINEMATCH_TRACE", "").lower() in ("1", "true", "yes", "otel"):
+    TRACER.enable(opentelemetry=os.environ["CINEMATCH_TRACE"].lower() == "otel")
+
+
+_NON_ALNUM_RE = re.compile(r"[^0-9a-z ]+")
+_SPACES_RE = re.compile(r"\s+")
 
 
 def clean_title(title: str) -> str:
@@ -76,12 +532,31 @@ def clean_title(title: str) -> str:
         return ""
     title = str(title)
     title = unicodedata.normalize("NFKD", title).encode("ascii", "ignore").decode("ascii")
-    title = re.sub(r"[^0-9a-z ]+", " ", title.lower().strip())
-    return re.sub(r"\s+", " ", title)
+    title = _NON_ALNUM_RE.sub(" ", title.lower().strip())
+    return _SPACES_RE.sub(" ", title)
+
+
+def clean_titles(titles: pd.Series) -> pd.Series:
+    """clean_title over a whole Series with vectorized .str ops; each distinct title is cleaned once."""
+    codes, uniques = pd.factorize(titles)
+    cleaned = (
+        pd.Series(np.asarray(uniques, dtype=object)).astype(str)
+        .str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii")
+        .str.lower().str.strip()
+        .str.replace(_NON_ALNUM_RE, " ", regex=True)
+        .str.replace(_SPACES_RE, " ", regex=True)
+    )
+    # Missing titles get code -1, which picks the trailing "".
+    values = np.append(cleaned.to_numpy(dtype=object), "")[codes]
+    return pd.Series(list(values), index=titles.index, name=titles.name)
 
 
 def build_vectorizer(corpus: pd.Series, ngram_range=(1, 2)):
-    """TF-IDF vectorizer on cleaned titles."""
+    """TF-IDF vectorizer on cleaned titles.
+
+    Rows are L2-normalized; the matrix is returned as CSC so each term's column is a
+    posting list of (title row, weight).
+    """
     vectorizer = TfidfVectorizer(
         ngram_range=ngram_range,
         stop_words="english",
@@ -89,9 +564,403 @@ def build_vectorizer(corpus: pd.Series, ngram_range=(1, 2)):
         min_df=2,
     )
     vectors = vectorizer.fit_transform(corpus.fillna("").astype(str))
+    return vectorizer, vectors.tocsc()
+
+
+TFIDF_ARTIFACT_VERSION = 1
+_TFIDF_SAVED_PARAMS = ("ngram_range", "stop_words", "strip_accents", "min_df")
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def save_tfidf_artifact(vectorizer: TfidfVectorizer, vectors, directory: str) -> str:
+    """Write vocabulary, IDF weights and the CSC title matrix as .npy files plus params.json."""
+    os.makedirs(directory, exist_ok=True)
+    vectors = sp.csc_matrix(vectors)
+    terms = np.empty(len(vectorizer.vocabulary_), dtype=object)
+    for term, col in vectorizer.vocabulary_.items():
+        terms[col] = term
+    np.save(os.path.join(directory, "terms.npy"), terms.astype(str))
+    np.save(os.path.join(directory, "idf.npy"), vectorizer.idf_)
+    np.save(os.path.join(directory, "data.npy"), vectors.data)
+    np.save(os.path.join(directory, "indices.npy"), vectors.indices)
+    np.save(os.path.join(directory, "indptr.npy"), vectors.indptr)
+    params = {k: v for k, v in vectorizer.get_params().items() if k in _TFIDF_SAVED_PARAMS}
+    params["ngram_range"] = list(params["ngram_range"])
+    with open(os.path.join(directory, "params.json"), "w") as fh:
+        json.dump({"params": params, "shape": list(vectors.shape), "version": TFIDF_ARTIFACT_VERSION}, fh)
+    return directory
+
+
+def load_tfidf_artifact(directory: str) -> Tuple[TfidfVectorizer, sp.csc_matrix]:
+    """Open a saved artifact: the matrix is memory-mapped and the vectorizer is transform-only (no refit)."""
+    with open(os.path.join(directory, "params.json")) as fh:
+        meta = json.load(fh)
+    params = dict(meta["params"], ngram_range=tuple(meta["params"]["ngram_range"]))
+    terms = np.load(os.path.join(directory, "terms.npy"))
+    vectorizer = TfidfVectorizer(vocabulary={str(t): i for i, t in enumerate(terms)}, **params)
+    vectorizer.idf_ = np.load(os.path.join(directory, "idf.npy"))
+    arrays = [np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in ("data", "indices", "indptr")]
+    vectors = sp.csc_matrix(tuple(arrays), shape=tuple(meta["shape"]), copy=False)
     return vectorizer, vectors
 
 
+def load_or_build_tfidf(
+    movies_df: pd.DataFrame, movies_path: Optional[str] = None
+) -> Tuple[TfidfVectorizer, sp.csc_matrix]:
+    """TF-IDF vectorizer and vectors for movies_df, loaded from an artifact keyed on movies.csv.
+
+    The artifact lives in .cache/tfidf/<sha256 of movies.csv>-v<version>/ next to the CSV, so
+    an edited movies.csv can never be served a stale vocabulary. It is built on a miss.
+    """
+    mp = movies_path or _data_path("movies.csv")
+    root = os.path.join(os.path.dirname(os.path.abspath(mp)), CACHE_DIRNAME, "tfidf")
+    name = f"{_file_digest(mp)}-v{TFIDF_ARTIFACT_VERSION}"
+    artifact = os.path.join(root, name)
+    if os.path.exists(os.path.join(artifact, "params.json")):
+        return load_tfidf_artifact(artifact)
+
+    corpus = movies_df["clean_title"] if "clean_title" in movies_df.columns else clean_titles(movies_df["title"])
+    vectorizer, vectors = build_vectorizer(corpus)
+    try:
+        os.makedirs(root, exist_ok=True)
+        # Artifacts of other movies.csv contents only; tmp* dirs are other processes' builds.
+        for stale in os.listdir(root):
+            if stale != name and "-v" in stale and not stale.startswith("tmp"):
+                shutil.rmtree(os.path.join(root, stale), ignore_errors=True)
+        tmp_dir = tempfile.mkdtemp(dir=root)
+        try:
+            save_tfidf_artifact(vectorizer, vectors, tmp_dir)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        _publish_dir(tmp_dir, artifact)
+    except OSError:
+        return vectorizer, vectors
+    try:
+        # Ours or, if another replica won the rename, theirs (same movies.csv, same content).
+        return load_tfidf_artifact(artifact)
+    except OSError:
+        return vectorizer, vectors
+
+
+def _posting_scores(query_vec, vectors: sp.csc_matrix) -> Tuple[np.ndarray, np.ndarray]:
+    """Cosine scores of a normalized query row against the title rows sharing one of its terms.
+
+    Walks only the posting lists of the query's non-zero terms; rows are returned sorted.
+    """
+    query_vec = query_vec.tocsr()
+    terms, weights = query_vec.indices, query_vec.data
+    if terms.size == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    starts, ends = vectors.indptr[terms], vectors.indptr[terms + 1]
+    rows = np.concatenate([vectors.indices[s:e] for s, e in zip(starts, ends)])
+    contrib = np.concatenate([vectors.data[s:e] * w for s, e, w in zip(starts, ends, weights)])
+    rows, inverse = np.unique(rows, return_inverse=True)
+    return rows, np.bincount(inverse, weights=contrib, minlength=len(rows))
+
+
+class TitleIndex:
+    """Inverted index over TF-IDF title vectors with MaxScore top-k pruning.
+
+    Each term's posting list holds (title row, tf-idf weight) sorted by row, plus the
+    largest weight in the list. A query scans in full only the "essential" lists whose
+    upper bounds could still lift a title over the current threshold; the remaining
+    lists are probed by binary search for surviving candidates only.
+    """
+
+    def __init__(self, vectorizer: TfidfVectorizer, vectors):
+        # Shares the arrays of a CSC matrix (e.g. the memory-mapped artifact); copies only to sort.
+        postings = vectors if sp.isspmatrix_csc(vectors) else sp.csc_matrix(vectors)
+        if not postings.has_sorted_indices:
+            postings = postings.sorted_indices()
+        self.vectorizer = vectorizer
+        self.indptr = postings.indptr
+        self.rows = postings.indices
+        self.weights = postings.data
+        self.max_weight = np.zeros(postings.shape[1])
+        nonempty = np.flatnonzero(np.diff(self.indptr))
+        if nonempty.size:
+            self.max_weight[nonempty] = np.maximum.reduceat(self.weights, self.indptr[nonempty])
+
+    def _postings(self, term: int) -> Tuple[np.ndarray, np.ndarray]:
+        lo, hi = self.indptr[term], self.indptr[term + 1]
+        return self.rows[lo:hi], self.weights[lo:hi]
+
+    def top_k(self, name: str, top_n: int = 10, min_score: float = 0.2) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows and scores of the top_n titles with cosine >= min_score for a cleaned query."""
+        query = self.vectorizer.transform([name]).tocsr()
+        terms, qweights = query.indices, query.data
+        empty = np.empty(0, dtype=np.int64), np.empty(0)
+        if terms.size == 0 or top_n <= 0:
+            return empty
+        bounds = qweights * self.max_weight[terms]
+        order = np.argsort(-bounds, kind="stable")
+        terms, qweights, bounds = terms[order], qweights[order], bounds[order]
+        # remaining[i]: best score a title could still gain from terms i onwards.
+        remaining = np.append(np.cumsum(bounds[::-1])[::-1], 0.0)
+
+        threshold = max(min_score, 0.0)
+        rows = np.empty(0, dtype=np.int64)
+        # Per-term contributions are kept so the final sum runs in vocabulary order, matching
+        # the brute-force scores bit for bit (and therefore their tie order).
+        contrib = np.zeros((0, len(terms)))
+        n_essential = 0
+        # Essential lists are scanned in full while a title absent from all of them so far
+        # could still reach the threshold, which rises to the k-th best partial score as
+        # each list is added (final scores only grow, so it never overshoots).
+        while n_essential < len(terms) and (n_essential == 0 or remaining[n_essential] >= threshold):
+            posting_rows, posting_weights = self._postings(terms[n_essential])
+            merged = np.union1d(rows, posting_rows)
+            grown = np.zeros((len(merged), len(terms)))
+            grown[np.searchsorted(merged, rows)] = contrib
+            grown[np.searchsorted(merged, posting_rows), n_essential] = qweights[n_essential] * posting_weights
+            rows, contrib = merged, grown
+            n_essential += 1
+            scores = contrib.sum(axis=1)
+            if len(scores) >= top_n:
+                threshold = max(threshold, np.partition(scores, len(scores) - top_n)[len(scores) - top_n])
+
+        for i in range(n_essential, len(terms)):
+            if len(scores) >= top_n:
+                threshold = max(threshold, np.partition(scores, len(scores) - top_n)[len(scores) - top_n])
+            alive = scores + remaining[i] >= threshold
+            rows, scores, contrib = rows[alive], scores[alive], contrib[alive]
+            if rows.size == 0:
+                return empty
+            posting_rows, posting_weights = self._postings(terms[i])
+            pos = np.searchsorted(posting_rows, rows)
+            pos[pos == len(posting_rows)] = 0
+            hit = posting_rows[pos] == rows if len(posting_rows) else np.zeros(len(rows), dtype=bool)
+            contrib[hit, i] = qweights[i] * posting_weights[pos[hit]]
+            scores[hit] += contrib[hit, i]
+
+        scores = np.zeros(len(rows))
+        for i in np.argsort(terms):
+            scores += contrib[:, i]
+        keep = (scores >= min_score) & (scores > 0)
+        rows, scores = rows[keep], scores[keep]
+        top = _top_k(scores, top_n)
+        return rows[top], scores[top]
+
+
+def _edit_distances(token: str, others: np.ndarray, lengths: np.ndarray, max_edits: int) -> np.ndarray:
+    """Optimal-string-alignment distances from token to each row of others (0-padded code
+    points, true lengths in lengths), capped at max_edits + 1; vectorized over the rows."""
+    query = np.array([ord(c) for c in token], dtype=others.dtype)
+    width = others.shape[1]
+    steps = np.arange(width + 1, dtype=np.int16)
+    out = np.full(len(others), max_edits + 1, dtype=np.int16)
+    alive = np.arange(len(others))
+    prev2, prev = None, np.broadcast_to(steps, (len(others), width + 1))
+    for i in range(1, len(query) + 1):
+        best = np.empty((len(alive), width + 1), dtype=np.int16)
+        best[:, 0] = i
+        best[:, 1:] = np.minimum(prev[:, 1:] + 1, prev[:, :-1] + (others != query[i - 1]))
+        if prev2 is not None and width > 1:
+            swap = (others[:, :-1] == query[i - 1]) & (others[:, 1:] == query[i - 2])
+            best[:, 2:] = np.where(swap, np.minimum(best[:, 2:], prev2[:, :-2] + 1), best[:, 2:])
+        # Insertions chain along the row: cur[j] = min over l <= j of best[l] + (j - l).
+        cur = np.minimum.accumulate(best - steps, axis=1) + steps
+        # A row whose every cell is over budget can only get worse; stop tracking it.
+        within = cur.min(axis=1) <= max_edits
+        if not within.all():
+            alive, others, lengths, cur = alive[within], others[within], lengths[within], cur[within]
+            prev = prev[within]
+            if not len(alive):
+                return out
+        prev2, prev = prev, cur
+    out[alive] = np.minimum(prev[np.arange(len(alive)), lengths], max_edits + 1)
+    return out
+
+
+def _max_edits(token: str) -> int:
+    """Typo budget per query token: none for 1-2 characters, one up to 5, then two."""
+    if len(token) <= 2:
+        return 0
+    return 1 if len(token) <= 5 else 2
+
+
+def _trigrams(token: str) -> set:
+    padded = f" {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Character-trigram index over clean_title tokens for typo-tolerant title search.
+
+    Trigram postings point at distinct title tokens; token postings point at title rows.
+    A query token is matched to vocabulary tokens sharing enough trigrams, verified with a
+    bounded edit distance, and only titles containing a verified token are scored.
+    """
+
+    def __init__(self, clean_titles: pd.Series):
+        token_lists = [str(t).split() for t in clean_titles.fillna("")]
+        vocab: Dict[str, int] = {}
+        token_rows, title_rows = [], []
+        for row, tokens in enumerate(token_lists):
+            for token in set(tokens):
+                token_rows.append(vocab.setdefault(token, len(vocab)))
+                title_rows.append(row)
+        self.tokens = list(vocab)
+        self.token_lengths = np.array([len(t) for t in self.tokens], dtype=np.int32)
+        # Code points of every token, 0-padded to the longest, for vectorized verification.
+        width = max(int(self.token_lengths.max(initial=0)), 1)
+        self.token_chars = np.array(self.tokens, dtype=f"<U{width}").view(np.uint32).reshape(len(self.tokens), width)
+        self.title_lengths = np.array([len(set(t)) for t in token_lists], dtype=np.int32)
+        self.token_titles = sp.csr_matrix(
+            (np.ones(len(token_rows), dtype=np.int8), (token_rows, title_rows)),
+            shape=(len(self.tokens), len(token_lists)),
+        )
+
+        grams: Dict[str, int] = {}
+        gram_rows, gram_tokens = [], []
+        for token_id, token in enumerate(self.tokens):
+            for gram in _trigrams(token):
+                gram_rows.append(grams.setdefault(gram, len(grams)))
+                gram_tokens.append(token_id)
+        self.grams = grams
+        self.gram_tokens = sp.csr_matrix(
+            (np.ones(len(gram_rows), dtype=np.int8), (gram_rows, gram_tokens)),
+            shape=(len(grams), len(self.tokens)),
+        )
+        self.token_gram_counts = np.bincount(np.asarray(gram_tokens, dtype=np.int64), minlength=len(self.tokens))
+
+    def _match_token(self, token: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Vocabulary token ids within the typo budget of token, with 1 - distance/length similarity."""
+        max_edits = _max_edits(token)
+        gram_ids = [self.grams[g] for g in _trigrams(token) if g in self.grams]
+        if not gram_ids:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        postings = self.gram_tokens[gram_ids]
+        candidates, shared = np.unique(postings.indices, return_counts=True)
+        # An edit destroys at most three trigrams of either token, an adjacent swap four,
+        # so both tokens' distinct trigram counts bound how many must be shared.
+        lengths = self.token_lengths[candidates]
+        min_shared = np.maximum(len(_trigrams(token)), self.token_gram_counts[candidates]) - 4 * max_edits
+        keep = (shared >= np.maximum(min_shared, 1)) & (np.abs(lengths - len(token)) <= max_edits)
+        candidates, lengths = candidates[keep], lengths[keep]
+        if candidates.size == 0:
+            return candidates.astype(np.int64), np.empty(0)
+        width = int(lengths.max())
+        dist = _edit_distances(token, self.token_chars[candidates, :width], lengths, max_edits)
+        ok = dist <= max_edits
+        sims = 1.0 - dist[ok] / np.maximum(len(token), lengths[ok])
+        return candidates[ok].astype(np.int64), sims
+
+    def top_k(self, name: str, top_n: int = 10, min_score: float = 0.2) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows and Dice-style scores of the best fuzzy title matches for a cleaned query."""
+        query_tokens = list(dict.fromkeys(name.split()))
+        rows_parts, sim_parts = [], []
+        for token in query_tokens:
+            token_ids, sims = self._match_token(token)
+            if token_ids.size == 0:
+                continue
+            postings = self.token_titles[token_ids]
+            rows = postings.indices
+            token_sims = np.repeat(sims, np.diff(postings.indptr))
+            # Best match per title for this query token.
+            order = np.lexsort((-token_sims, rows))
+            rows, first = np.unique(rows[order], return_index=True)
+            rows_parts.append(rows)
+            sim_parts.append(token_sims[order][first])
+        if not rows_parts:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        rows, inverse = np.unique(np.concatenate(rows_parts), return_inverse=True)
+        matched = np.bincount(inverse, weights=np.concatenate(sim_parts), minlength=len(rows))
+        scores = 2.0 * matched / (len(query_tokens) + self.title_lengths[rows])
+        keep = scores >= min_score
+        rows, scores = rows[keep], scores[keep]
+        top = _top_k(scores, top_n)
+        return rows[top], scores[top]
+
+
+def get_trigram_index(movies_df: pd.DataFrame) -> TrigramIndex:
+    """Return the TrigramIndex for movies_df's clean_title column, building it on first use."""
+    def build(df: pd.DataFrame) -> TrigramIndex:
+        titles = df["clean_title"] if "clean_title" in df.columns else clean_titles(df["title"])
+        return TrigramIndex(titles)
+    return _cached_for_frame(movies_df, "trigrams", build)
+
+
+class PrefixIndex:
+    """Sorted array of clean_title tokens and full titles for as-you-type suggestions.
+
+    Every key maps to a movie row; rows are ranked by popularity (rating count). The
+    best rows for every prefix of up to PRECOMPUTED_PREFIX_LEN characters are stored
+    up front, so the short, broad prefixes typed first are a dict lookup; longer prefixes
+    binary-search a narrow key range.
+    """
+
+    PRECOMPUTED_PREFIX_LEN = 3
+    PRECOMPUTED_DEPTH = 50
+
+    def __init__(self, clean_titles: pd.Series, titles: pd.Series, popularity: Optional[np.ndarray] = None):
+        self.titles = titles.fillna("").astype(str).to_numpy()
+        self.popularity = (
+            np.zeros(len(self.titles)) if popularity is None else np.asarray(popularity, dtype=np.float64)
+        )
+        keys, rows = [], []
+        for row, name in enumerate(clean_titles.fillna("").astype(str)):
+            name = name.strip()
+            for key in {name, *name.split()}:
+                if key:
+                    keys.append(key)
+                    rows.append(row)
+        keys = np.array(keys, dtype=str)
+        rows = np.array(rows, dtype=np.int64)
+        order = np.argsort(keys, kind="stable")
+        self.keys, self.rows = keys[order], rows[order]
+        self._top: Dict[str, np.ndarray] = {}
+        for length in range(1, self.PRECOMPUTED_PREFIX_LEN + 1):
+            prefixes = np.array([k[:length] for k in self.keys], dtype=str)
+            starts = np.flatnonzero(np.r_[True, prefixes[1:] != prefixes[:-1]])
+            bounds = np.append(starts, len(prefixes))
+            for lo, hi in zip(bounds[:-1], bounds[1:]):
+                if len(prefixes[lo]) == length:
+                    self._top[str(prefixes[lo])] = self._rank(self.rows[lo:hi], self.PRECOMPUTED_DEPTH)
+
+    def _rank(self, rows: np.ndarray, k: int) -> np.ndarray:
+        """Distinct rows ordered by popularity (descending), then row, truncated to k."""
+        rows = np.unique(rows)
+        order = np.lexsort((rows, -self.popularity[rows]))
+        return rows[order[:k]]
+
+    def suggest(self, prefix: str, k: int = 10) -> List[str]:
+        """Up to k titles having a word, or the whole title, starting with prefix."""
+        prefix = clean_title(prefix).lstrip()
+        if not prefix or k <= 0:
+            return []
+        if k <= self.PRECOMPUTED_DEPTH and prefix in self._top:
+            rows = self._top[prefix][:k]
+        else:
+            lo = np.searchsorted(self.keys, prefix, side="left")
+            hi = np.searchsorted(self.keys, prefix + "\uffff", side="left")
+            rows = self._rank(self.rows[lo:hi], k)
+        return [str(t) for t in self.titles[rows]]
+
+
+def build_prefix_index(movies_df: pd.DataFrame, ratings_df: Optional[pd.DataFrame] = None) -> PrefixIndex:
+    """Build a PrefixIndex over movies_df, ranking titles by their number of ratings."""
+    clean = movies_df["clean_title"] if "clean_title" in movies_df.columns else clean_titles(movies_df["title"])
+    popularity = None
+    if ratings_df is not None:
+        counts = ratings_df["movieId"].value_counts()
+        popularity = counts.reindex(movies_df["movieId"].to_numpy(), fill_value=0).to_numpy()
+    return PrefixIndex(clean, movies_df["title"], popularity)
+
+
+def suggest(prefix: str, index: PrefixIndex, k: int = 10) -> List[str]:
+    """As-you-type title suggestions for prefix, most popular first."""
+    return index.suggest(prefix, k)
+
+
 def search_movie(
     query: str,
     movies_df: pd.DataFrame,
@@ -99,19 +968,686 @@ def search_movie(
     vectors,
     top_n: int = 10,
     min_score: float = 0.2,
+    index: Optional[TitleIndex] = None,
+    mode: str = "tfidf",
+    fuzzy_index: Optional[TrigramIndex] = None,
 ) -> pd.DataFrame:
-    """Return top_n movies matching query by TF-IDF cosine similarity."""
-    name = clean_title(query)
-    if not name.strip():
-        return pd.DataFrame(columns=list(movies_df.columns) + ["_score"])
-    vec = vectorizer.transform([name])
-    sims = cosine_similarity(vec, vectors).flatten()
-    if sims.size == 0 or sims.max() < min_score:
-        return pd.DataFrame(columns=list(movies_df.columns) + ["_score"])
-    idx = sims.argsort()[-top_n:][::-1]
-    out = movies_df.iloc[idx].copy()
-    out["_score"] = sims[idx]
-    return out
+    """Return up to top_n movies matching query by TF-IDF cosine similarity.
+
+    Only titles sharing a term with the query and scoring at least min_score are returned.
+    Pass a TitleIndex built from the same vectorizer/vectors to use pruned top-k retrieval.
+    mode="fuzzy" instead matches query words to title words within a small edit distance
+    through a TrigramIndex (built from movies_df on first use when not given).
+    """
+    if mode not in ("tfidf", "fuzzy"):
+        raise ValueError(f"Unknown search mode: {mode!r}")
+    with TRACER.trace(f"search.{mode}") as trace:
+        name = clean_title(query)
+        trace.mark("clean")
+        if not name.strip():
+            return pd.DataFrame(columns=list(movies_df.columns) + ["_score"])
+        if mode == "fuzzy":
+            rows, scores = (fuzzy_index or get_trigram_index(movies_df)).top_k(name, top_n, min_score)
+        elif index is not None:
+            rows, scores = index.top_k(name, top_n, min_score)
+        else:
+            if not sp.isspmatrix_csc(vectors):
+                vectors = sp.csc_matrix(vectors)
+            rows, scores = _posting_scores(vectorizer.transform([name]), vectors)
+            keep = (scores >= min_score) & (scores > 0)
+            rows, scores = rows[keep], scores[keep]
+            top = _top_k(scores, top_n)
+            rows, scores = rows[top], scores[top]
+        trace.mark("score", rows.size)
+        if rows.size == 0:
+            return pd.DataFrame(columns=list(movies_df.columns) + ["_score"])
+        out = movies_df.iloc[rows].copy()
+        out["_score"] = scores
+        trace.mark("frame", len(out))
+        return out
+
+
+def _rank_rows(rows: np.ndarray, cols: np.ndarray, scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of each row's top-k (score desc, column asc) entries, grouped by row in order."""
+    order = np.lexsort((cols, -scores, rows))
+    rows = rows[order]
+    rank = np.arange(rows.size) - np.searchsorted(rows, rows, side="left")
+    return order[rank < k]
+
+
+def search_movies_batch(
+    queries,
+    movies_df: pd.DataFrame,
+    vectorizer: TfidfVectorizer,
+    vectors,
+    top_n: int = 10,
+    min_score: float = 0.2,
+    chunk_size: int = 512,
+) -> pd.DataFrame:
+    """search_movie for many queries at once, as one long frame.
+
+    All queries are cleaned and transformed together, then scored chunk_size at a time
+    with one sparse product against the title matrix. Each query's matches are ranked as
+    search_movie ranks them; rows carry queryId (position in queries) and query.
+    """
+    queries = list(queries)
+    if not queries:
+        return pd.DataFrame(columns=["queryId", "query"] + list(movies_df.columns) + ["_score"])
+    with TRACER.trace("search.batch") as trace:
+        names = clean_titles(pd.Series(queries, dtype=object))
+        trace.mark("clean", len(queries))
+        query_vecs = vectorizer.transform(names).tocsr()
+        trace.mark("transform", query_vecs.nnz)
+        terms_by_title = sp.csr_matrix(vectors.T)
+        query_ids, rows, scores = [], [], []
+        for start in range(0, len(queries), chunk_size):
+            block = query_vecs[start:start + chunk_size] @ terms_by_title
+            block_rows = np.repeat(np.arange(block.shape[0]), np.diff(block.indptr))
+            keep = (block.data >= min_score) & (block.data > 0)
+            r, c, v = block_rows[keep], block.indices[keep], block.data[keep]
+            top = _rank_rows(r, c, v, top_n)
+            query_ids.append(r[top] + start)
+            rows.append(c[top])
+            scores.append(v[top])
+        query_ids, rows = np.concatenate(query_ids), np.concatenate(rows)
+        trace.mark("score", len(rows))
+        out = movies_df.iloc[rows].copy()
+        out.insert(0, "query", np.asarray(queries, dtype=object)[query_ids])
+        out.insert(0, "queryId", query_ids)
+        out["_score"] = np.concatenate(scores)
+        trace.mark("frame", len(out))
+        return out
+
+
+class _LikedState(NamedTuple):
+    """One immutable version of a CooccurrenceIndex: base matrices plus the delta segment."""
+
+    user_items: sp.csr_matrix
+    item_users: sp.csr_matrix
+    movie_ids: np.ndarray
+    user_ids: Optional[np.ndarray]
+    item_counts: np.ndarray
+    version: int
+    new_users: Dict[int, int]
+    new_movies: Dict[int, int]
+    all_movie_ids: np.ndarray
+    delta_pairs: np.ndarray
+    delta_user_items: sp.csr_matrix
+    delta_item_users: sp.csr_matrix
+    counts: np.ndarray
+
+
+def _base_state(
+    user_items: sp.csr_matrix,
+    item_users: sp.csr_matrix,
+    movie_ids: np.ndarray,
+    user_ids: Optional[np.ndarray],
+    version: int = 0,
+) -> _LikedState:
+    """A state with an empty delta segment over the given base matrices."""
+    n_users, n_items = user_items.shape
+    # Stored values count duplicate (user, movie) rows, so row sums match value_counts.
+    item_counts = np.asarray(item_users.sum(axis=1)).ravel()
+    return _LikedState(
+        user_items, item_users, movie_ids, user_ids, item_counts, version,
+        new_users={},
+        new_movies={},
+        all_movie_ids=np.asarray(movie_ids),
+        delta_pairs=np.empty((0, 2), dtype=np.int64),
+        delta_user_items=sp.csr_matrix((n_users, n_items), dtype=np.int32),
+        delta_item_users=sp.csr_matrix((n_items, n_users), dtype=np.int32),
+        counts=item_counts,
+    )
+
+
+class CooccurrenceIndex:
+    """Sparse user x item "liked" (rating >= 4) matrix for collaborative-filtering lookups.
+
+    Built once from the ratings; each lookup only touches the rows of users who liked
+    the seed and the columns of the candidate movies, not the whole ratings table.
+    New ratings go into a small in-memory delta segment (append_ratings) that lookups
+    read alongside the base matrices; merge() folds it into the base.
+
+    Writers build a new immutable _LikedState and swap it in with one assignment, so
+    lookups read whichever state was current when they started and never take a lock.
+    """
+
+    LIKED_THRESHOLD = 4
+    # Fold the delta into the base once it holds this fraction of the base's entries.
+    MERGE_FRACTION = 0.10
+
+    def __init__(
+        self,
+        user_items: sp.csr_matrix,
+        item_users: sp.csr_matrix,
+        movie_ids: np.ndarray,
+        user_ids: Optional[np.ndarray] = None,
+    ):
+        self._state = _base_state(user_items, item_users, movie_ids, user_ids)
+        # Serializes writers only; readers take self._state as it is.
+        self._lock = threading.Lock()
+
+    @property
+    def user_items(self) -> sp.csr_matrix:
+        return self._state.user_items
+
+    @property
+    def item_users(self) -> sp.csr_matrix:
+        return self._state.item_users
+
+    @property
+    def movie_ids(self) -> np.ndarray:
+        return self._state.movie_ids
+
+    @property
+    def user_ids(self) -> Optional[np.ndarray]:
+        return self._state.user_ids
+
+    @property
+    def item_counts(self) -> np.ndarray:
+        return self._state.item_counts
+
+    @property
+    def version(self) -> int:
+        """Bumped whenever the liked data changes; result caches key off it."""
+        return self._state.version
+
+    @classmethod
+    def from_ratings(cls, ratings_df: pd.DataFrame, threshold: float = 4) -> "CooccurrenceIndex":
+        """Build the index from a ratings frame with userId, movieId and rating columns."""
+        liked = ratings_df.loc[ratings_df["rating"] >= threshold, ["userId", "movieId"]]
+        # int64 IDs whatever the frame's dtypes (compact frames use int32), as the store does.
+        user_ids, user_codes = np.unique(liked["userId"].to_numpy(np.int64), return_inverse=True)
+        movie_ids, movie_codes = np.unique(liked["movieId"].to_numpy(np.int64), return_inverse=True)
+        ones = np.ones(len(liked), dtype=np.int32)
+        user_items = sp.csr_matrix(
+            (ones, (user_codes, movie_codes)), shape=(len(user_ids), len(movie_ids))
+        )
+        user_items.sum_duplicates()
+        item_users = user_items.T.tocsr()
+        item_users.sort_indices()
+        return cls(user_items, item_users, movie_ids, user_ids)
+
+    _ARRAYS = ("user_indptr", "user_indices", "user_data", "item_indptr", "item_indices", "item_data")
+
+    def save(self, directory: str) -> str:
+        """Write the CSR arrays as .npy files so other processes can memory-map them."""
+        self.merge()
+        state = self._state
+        os.makedirs(directory, exist_ok=True)
+        arrays = {
+            "user_indptr": state.user_items.indptr,
+            "user_indices": state.user_items.indices,
+            "user_data": state.user_items.data,
+            "item_indptr": state.item_users.indptr,
+            "item_indices": state.item_users.indices,
+            "item_data": state.item_users.data,
+            "movie_ids": state.movie_ids,
+        }
+        if state.user_ids is not None:
+            arrays["user_ids"] = state.user_ids
+        for name, arr in arrays.items():
+            np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(arr))
+        return directory
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: Optional[str] = "r") -> "CooccurrenceIndex":
+        """Open an index written by save(); with mmap_mode="r" the arrays stay in the page cache."""
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in cls._ARRAYS + ("movie_ids",)
+        }
+        user_ids_path = os.path.join(directory, "user_ids.npy")
+        user_ids = np.load(user_ids_path, mmap_mode=mmap_mode) if os.path.exists(user_ids_path) else None
+        n_users = len(arrays["user_indptr"]) - 1
+        n_items = len(arrays["item_indptr"]) - 1
+        user_items = sp.csr_matrix(
+            (arrays["user_data"], arrays["user_indices"], arrays["user_indptr"]),
+            shape=(n_users, n_items), copy=False,
+        )
+        item_users = sp.csr_matrix(
+            (arrays["item_data"], arrays["item_indices"], arrays["item_indptr"]),
+            shape=(n_items, n_users), copy=False,
+        )
+        return cls(user_items, item_users, arrays["movie_ids"], user_ids)
+
+    @staticmethod
+    def _item_code(state: _LikedState, movie_id: int) -> int:
+        pos = int(np.searchsorted(state.movie_ids, movie_id))
+        if pos < len(state.movie_ids) and state.movie_ids[pos] == movie_id:
+            return pos
+        return state.new_movies.get(int(movie_id), -1)
+
+    @staticmethod
+    def _known_codes(state: _LikedState, movie_ids: np.ndarray) -> np.ndarray:
+        """Codes of the movie_ids this state knows (base or delta); unknown IDs are dropped."""
+        ids = np.asarray(movie_ids, dtype=np.int64)
+        codes = np.full(len(ids), -1, dtype=np.int64)
+        if len(state.movie_ids):
+            pos = np.minimum(np.searchsorted(state.movie_ids, ids), len(state.movie_ids) - 1)
+            found = np.asarray(state.movie_ids)[pos] == ids
+            codes[found] = pos[found]
+        if state.new_movies:
+            for i in np.flatnonzero(codes < 0):
+                codes[i] = state.new_movies.get(int(ids[i]), -1)
+        return codes[codes >= 0]
+
+    def user_likes(self, user_id: int) -> np.ndarray:
+        """movieIds user_id liked, from the base matrix and the delta segment (empty if unknown)."""
+        state = self._state
+        if state.user_ids is None:
+            return np.empty(0, dtype=np.int64)
+        pos = int(np.searchsorted(state.user_ids, user_id))
+        if pos < len(state.user_ids) and state.user_ids[pos] == user_id:
+            code = pos
+        else:
+            code = state.new_users.get(int(user_id), -1)
+        if code < 0:
+            return np.empty(0, dtype=np.int64)
+        items, _ = self._rows(state.user_items, state.delta_user_items, np.array([code]))
+        return np.unique(state.all_movie_ids[items])
+
+    @staticmethod
+    def _codes(ids: np.ndarray, base_ids: np.ndarray, new: Dict[int, int], offset: int) -> np.ndarray:
+        """Dense codes for ids: positions in the sorted base IDs, else (new) codes after them."""
+        pos = np.searchsorted(base_ids, ids)
+        found = np.zeros(len(ids), dtype=bool)
+        inside = pos < len(base_ids)
+        found[inside] = np.asarray(base_ids)[pos[inside]] == ids[inside]
+        codes = np.where(found, pos, -1).astype(np.int64)
+        for i in np.flatnonzero(~found):
+            codes[i] = new.setdefault(int(ids[i]), offset + len(new))
+        return codes
+
+    def append_ratings(self, ratings_df: pd.DataFrame) -> int:
+        """Add new ratings without a rebuild; returns the number of liked rows taken in.
+
+        Liked rows (rating >= 4) for known or brand-new users and movies land in the delta
+        segment and show up in the next similar() call. A later rating below 4 does not
+        retract an earlier like. Bumps version, which invalidates result caches.
+        """
+        if self.user_ids is None:
+            raise ValueError("This index was saved without user IDs; rebuild it to accept appends")
+        liked = ratings_df.loc[ratings_df["rating"] >= self.LIKED_THRESHOLD, ["userId", "movieId"]]
+        if liked.empty:
+            return 0
+        with self._lock:
+            state = self._state
+            n_users, n_items = state.user_items.shape
+            # Copies: the current state's dicts may be in use by readers.
+            new_users, new_movies = dict(state.new_users), dict(state.new_movies)
+            users = self._codes(liked["userId"].to_numpy(np.int64), state.user_ids, new_users, n_users)
+            items = self._codes(liked["movieId"].to_numpy(np.int64), state.movie_ids, new_movies, n_items)
+            delta_pairs = np.vstack([state.delta_pairs, np.column_stack([users, items])])
+            n_items_all = n_items + len(new_movies)
+            ones = np.ones(len(delta_pairs), dtype=np.int32)
+            delta = sp.csr_matrix(
+                (ones, (delta_pairs[:, 0], delta_pairs[:, 1])), shape=(n_users + len(new_users), n_items_all)
+            )
+            delta.sum_duplicates()
+            delta_item_users = delta.T.tocsr()
+            new_movie_ids = np.fromiter(new_movies, dtype=np.int64, count=len(new_movies))
+            counts = np.zeros(n_items_all, dtype=np.int64)
+            counts[:n_items] = state.item_counts
+            counts += np.asarray(delta_item_users.sum(axis=1)).ravel()
+            self._state = state._replace(
+                version=state.version + 1,
+                new_users=new_users,
+                new_movies=new_movies,
+                all_movie_ids=np.concatenate([np.asarray(state.movie_ids, dtype=np.int64), new_movie_ids]),
+                delta_pairs=delta_pairs,
+                delta_user_items=delta,
+                delta_item_users=delta_item_users,
+                counts=counts,
+            )
+        if delta.nnz > self.MERGE_FRACTION * max(state.user_items.nnz, 1):
+            self.merge()
+        return len(liked)
+
+    def merge(self) -> None:
+        """Fold the delta segment into the base matrices (in memory; drops any memory map)."""
+        with self._lock:
+            state = self._state
+            if not state.delta_pairs.size:
+                return
+            n_users_all, n_items_all = state.delta_user_items.shape
+            base = state.user_items.tocoo()
+            user_items = sp.csr_matrix(
+                (base.data, (base.row, base.col)), shape=(n_users_all, n_items_all)
+            ) + state.delta_user_items
+            new_user_ids = np.fromiter(state.new_users, dtype=np.int64, count=len(state.new_users))
+            user_ids = np.concatenate([np.asarray(state.user_ids, dtype=np.int64), new_user_ids])
+            user_order = np.argsort(user_ids, kind="stable")
+            item_order = np.argsort(state.all_movie_ids, kind="stable")
+            user_items = user_items[user_order][:, item_order].tocsr()
+            user_items.sort_indices()
+            item_users = user_items.T.tocsr()
+            item_users.sort_indices()
+            # The liked data is unchanged, so the version (and cached results) carry over.
+            self._state = _base_state(
+                user_items, item_users, state.all_movie_ids[item_order], user_ids[user_order], state.version
+            )
+
+    @staticmethod
+    def _rows(base: sp.csr_matrix, delta: sp.csr_matrix, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Column indices and values of rows, read from the base matrix and the delta segment."""
+        in_base = rows[rows < base.shape[0]]
+        part = base[in_base]
+        if not delta.nnz:
+            return part.indices, part.data
+        extra = delta[rows]
+        return np.concatenate([part.indices, extra.indices]), np.concatenate([part.data, extra.data])
+
+    def similar(self, movie_id: int, min_fraction: float = 0.10) -> pd.DataFrame:
+        """Return similar/all liked fractions indexed by movieId for movies co-liked with movie_id."""
+        with TRACER.trace("cf.similar") as trace:
+            return self._similar(self._state, movie_id, min_fraction, trace)
+
+    def _similar(self, state: _LikedState, movie_id: int, min_fraction: float, trace=_NULL_TRACE) -> pd.DataFrame:
+        empty = pd.DataFrame(columns=["similar", "all"], dtype=float)
+        code = self._item_code(state, movie_id)
+        if code < 0:
+            return empty
+        users, _ = self._rows(state.item_users, state.delta_item_users, np.array([code]))
+        users = np.unique(users)
+        trace.mark("seed_users", len(users))
+        if len(users) == 0:
+            return empty
+
+        indices, data = self._rows(state.user_items, state.delta_user_items, users)
+        trace.mark("user_items", len(indices))
+        items, inverse = np.unique(indices, return_inverse=True)
+        sim_frac = np.bincount(inverse, weights=data) / len(users)
+        keep = sim_frac > min_fraction
+        items, sim_frac = items[keep], sim_frac[keep]
+        trace.mark("cooccurrence", len(items))
+        if len(items) == 0:
+            return empty
+
+        num_all = len(np.unique(self._rows(state.item_users, state.delta_item_users, items)[0]))
+        trace.mark("all_users", num_all)
+        if num_all == 0:
+            return empty
+        all_frac = state.counts[items] / num_all
+        movie_ids = state.all_movie_ids[items]
+        if state.new_movies:
+            # Codes of movies first seen in the delta are not in movieId order.
+            order = np.argsort(movie_ids, kind="stable")
+            movie_ids, sim_frac, all_frac = movie_ids[order], sim_frac[order], all_frac[order]
+        out = pd.DataFrame(
+            {"similar": sim_frac, "all": all_frac},
+            index=pd.Index(movie_ids, name="movieId"),
+        )
+        trace.mark("frame", len(out))
+        return out
+
+    @staticmethod
+    def _gather(base: sp.csr_matrix, delta: sp.csr_matrix, rows: np.ndarray) -> sp.csr_matrix:
+        """rows of the base matrix plus the delta segment, as one matrix with the delta's width."""
+        if base.shape[0]:
+            part = base[np.minimum(rows, base.shape[0] - 1)]
+        else:
+            part = sp.csr_matrix((len(rows), base.shape[1]), dtype=base.dtype)
+        if not delta.nnz:
+            return part.tocsr()
+        # Codes past the base rows belong to movies or users first seen in the delta.
+        part = (sp.diags((rows < base.shape[0]).astype(part.dtype), dtype=part.dtype) @ part).tocsr()
+        part.resize(len(rows), delta.shape[1])
+        return (part + delta[rows]).tocsr()
+
+    def similar_batch(self, movie_ids, min_fraction: float = 0.10, chunk_size: int = 256) -> pd.DataFrame:
+        """similar() for many seeds at once, as a long frame with seedId, movieId, similar and all.
+
+        The seeds' liker sets form one seeds x users matrix: its product with user_items
+        gives every seed's co-liked counts, and the product of each seed's candidate mask
+        with item_users its liker union. Distinct seeds come in first-seen order (chunk_size
+        per product), each seed's rows ordered by movieId; unknown seeds have no rows.
+        """
+        seeds = pd.unique(np.asarray(movie_ids, dtype=np.int64).ravel())
+        state = self._state
+        with TRACER.trace("cf.similar_batch") as trace:
+            parts = [
+                self._similar_batch(state, seeds[start:start + chunk_size], min_fraction, trace)
+                for start in range(0, len(seeds), chunk_size)
+            ]
+        if not parts:
+            return pd.DataFrame(columns=["seedId", "movieId", "similar", "all"])
+        return pd.concat(parts, ignore_index=True)
+
+    def _similar_batch(
+        self, state: _LikedState, seeds: np.ndarray, min_fraction: float, trace=_NULL_TRACE
+    ) -> pd.DataFrame:
+        codes = np.array([self._item_code(state, m) for m in seeds], dtype=np.int64)
+        seeds, codes = seeds[codes >= 0], codes[codes >= 0]
+        n_users, n_items = state.user_items.shape
+        likers = self._gather(state.item_users, state.delta_item_users, codes)
+        # Streamed stores keep duplicate rows as separate entries; count each liker once.
+        likers.sum_duplicates()
+        likers.data[:] = 1
+        n_likers = np.diff(likers.indptr)
+        trace.mark("seed_users", likers.nnz)
+
+        co = (likers[:, :n_users] @ state.user_items).tocsr()
+        if state.delta_user_items.nnz:
+            co.resize(len(codes), state.delta_user_items.shape[1])
+            co = (co + likers @ state.delta_user_items).tocsr()
+        rows = np.repeat(np.arange(len(codes)), np.diff(co.indptr))
+        sim_frac = co.data / n_likers[rows]
+        keep = sim_frac > min_fraction
+        rows, items, sim_frac = rows[keep], co.indices[keep], sim_frac[keep]
+        trace.mark("cooccurrence", len(items))
+
+        candidates = sp.csr_matrix(
+            (np.ones(len(items), dtype=np.int32), (rows, items)), shape=(len(codes), co.shape[1])
+        )
+        union = (candidates[:, :n_items] @ state.item_users).tocsr()
+        if state.delta_item_users.nnz:
+            union.resize(len(codes), state.delta_item_users.shape[1])
+            union = (union + candidates @ state.delta_item_users).tocsr()
+        num_all = np.diff(union.indptr)
+        trace.mark("all_users", int(num_all.sum()))
+
+        movie_ids = state.all_movie_ids[items]
+        order = np.lexsort((movie_ids, rows))
+        rows, items, movie_ids, sim_frac = rows[order], items[order], movie_ids[order], sim_frac[order]
+        out = pd.DataFrame({
+            "seedId": seeds[rows],
+            "movieId": movie_ids,
+            "similar": sim_frac,
+            "all": state.counts[items] / num_all[rows],
+        })
+        trace.mark("frame", len(out))
+        return out
+
+    def recommend(self, liked_movie_ids, exclude_movie_ids=(), min_fraction: float = 0.10) -> pd.DataFrame:
+        """similar/all fractions indexed by movieId for movies co-liked with a set of liked movies.
+
+        similar is similar()'s fraction averaged over the liked movies, computed for all of
+        them at once with two sparse vector-matrix products: a weight per user (the sum of
+        1 / likers over the liked movies they liked), then per movie over the users who
+        liked it. all is the fraction of all users who liked the movie. The liked movies
+        and exclude_movie_ids are left out.
+        """
+        empty = pd.DataFrame(columns=["similar", "all"], dtype=float)
+        state = self._state
+        with TRACER.trace("cf.recommend") as trace:
+            codes = self._known_codes(state, np.unique(np.asarray(liked_movie_ids, dtype=np.int64)))
+            trace.mark("seeds", len(codes))
+            if not len(codes):
+                return empty
+            likers = self._gather(state.item_users, state.delta_item_users, codes)
+            likers.sum_duplicates()
+            likers.data[:] = 1
+            n_likers = np.diff(likers.indptr)
+            inverse = np.divide(1.0, n_likers, out=np.zeros(len(codes)), where=n_likers > 0)
+            weights = (sp.csr_matrix(inverse[None, :]) @ likers).tocsr()
+            trace.mark("user_weights", weights.nnz)
+
+            n_users = state.user_items.shape[0]
+            totals = (weights[:, :n_users] @ state.user_items).tocsr()
+            if state.delta_user_items.nnz:
+                totals.resize(1, state.delta_user_items.shape[1])
+                totals = (totals + weights @ state.delta_user_items).tocsr()
+            items, sim_frac = totals.indices, totals.data / len(codes)
+            exclude = np.asarray(list(exclude_movie_ids), dtype=np.int64)
+            excluded = np.concatenate([codes, self._known_codes(state, exclude)])
+            keep = (sim_frac > min_fraction) & ~np.isin(items, excluded)
+            items, sim_frac = items[keep], sim_frac[keep]
+            trace.mark("cooccurrence", len(items))
+            if not len(items):
+                return empty
+
+            all_frac = state.counts[items] / (n_users + len(state.new_users))
+            movie_ids = state.all_movie_ids[items]
+            order = np.argsort(movie_ids, kind="stable")
+            out = pd.DataFrame(
+                {"similar": sim_frac[order], "all": all_frac[order]},
+                index=pd.Index(movie_ids[order], name="movieId"),
+            )
+            trace.mark("frame", len(out))
+            return out
+
+
+_FRAME_CACHE: Dict[Tuple[int, str], Tuple[weakref.ref, Tuple[int, int], object]] = {}
+
+
+def _cached_for_frame(df: pd.DataFrame, name: str, build):
+    """Return build(df), memoized for as long as df itself is alive and keeps its shape.
+
+    Rows added or dropped in place trigger a rebuild; values edited in place do not.
+    """
+    key = (id(df), name)
+    cached = _FRAME_CACHE.get(key)
+    if cached is not None and cached[0]() is df and cached[1] == df.shape:
+        return cached[2]
+    value = build(df)
+    _FRAME_CACHE[key] = (weakref.ref(df, lambda _: _FRAME_CACHE.pop(key, None)), df.shape, value)
+    return value
+
+
+def get_cooccurrence_index(ratings_df: pd.DataFrame) -> CooccurrenceIndex:
+    """Return the CooccurrenceIndex for ratings_df, building it on first use."""
+    return _cached_for_frame(ratings_df, "cooccurrence", CooccurrenceIndex.from_ratings)
+
+
+def _title_lookup(movies_df: pd.DataFrame) -> pd.DataFrame:
+    """title/genres indexed by movieId; the index hash table is built once per movies_df."""
+    return _cached_for_frame(
+        movies_df, "titles", lambda df: df.set_index("movieId")[["title", "genres"]]
+    )
+
+
+def _attach_titles(rec: pd.DataFrame, movies_df: pd.DataFrame) -> pd.DataFrame:
+    """Join title/genres onto ranked recommendations by movieId lookup rather than a merge."""
+    titles = _title_lookup(movies_df).reindex(rec["movieId"].to_numpy())
+    rec = rec.reset_index(drop=True)
+    rec["title"] = titles["title"].to_numpy()
+    rec["genres"] = titles["genres"].to_numpy()
+    leading = ["seedId"] if "seedId" in rec.columns else []
+    return rec[leading + ["score", "similar", "all", "movieId", "title", "genres"]]
+
+
+def _fill_csr(
+    pairs: np.ndarray, row_col: Tuple[int, int], n_rows: int, out_dir: str, prefix: str, chunksize: int
+) -> None:
+    """Counting-sort (row, col) code pairs into CSR .npy arrays on disk, one chunk at a time."""
+    row_at, col_at = row_col
+    counts = np.zeros(n_rows, dtype=np.int64)
+    for lo in range(0, len(pairs), chunksize):
+        counts += np.bincount(pairs[lo:lo + chunksize, row_at], minlength=n_rows)
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    np.save(os.path.join(out_dir, f"{prefix}_indptr.npy"), indptr)
+
+    nnz = int(indptr[-1])
+    indices = np.lib.format.open_memmap(os.path.join(out_dir, f"{prefix}_indices.npy"), "w+", np.int32, (nnz,))
+    data = np.lib.format.open_memmap(os.path.join(out_dir, f"{prefix}_data.npy"), "w+", np.int32, (nnz,))
+    cursor = indptr[:-1].copy()
+    for lo in range(0, len(pairs), chunksize):
+        chunk = np.asarray(pairs[lo:lo + chunksize])
+        order = np.argsort(chunk[:, row_at], kind="stable")
+        rows, cols = chunk[order, row_at], chunk[order, col_at]
+        starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        rank = np.arange(len(rows)) - np.repeat(starts, np.diff(np.append(starts, len(rows))))
+        pos = cursor[rows] + rank
+        indices[pos] = cols
+        data[pos] = 1
+        cursor += np.bincount(rows, minlength=n_rows)
+    indices.flush()
+    data.flush()
+    del indices, data
+
+
+def build_cooccurrence_store(
+    ratings_path: str, out_dir: str, chunksize: int = 2_000_000, threshold: float = 4
+) -> str:
+    """Stream ratings.csv in chunks into CooccurrenceIndex arrays in out_dir (see CooccurrenceIndex.load).
+
+    Only liked (user, movie) pairs are kept, spilled to a temp file as ID pairs; the CSR
+    arrays are then filled incrementally through memory maps. Peak memory is one chunk plus
+    per-user and per-movie counters, never the full ratings frame. Duplicate rows are kept
+    as separate entries, which every CooccurrenceIndex query counts the same as summed ones.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    spill_path = os.path.join(out_dir, "pairs.tmp")
+    user_ids = np.empty(0, dtype=np.int64)
+    movie_ids = np.empty(0, dtype=np.int64)
+    n_pairs = 0
+    reader = pd.read_csv(
+        ratings_path,
+        usecols=["userId", "movieId", "rating"],
+        dtype={"userId": np.int64, "movieId": np.int64, "rating": np.float32},
+        chunksize=chunksize,
+    )
+    with open(spill_path, "wb") as spill:
+        for chunk in reader:
+            liked = chunk.loc[chunk["rating"] >= threshold, ["userId", "movieId"]].to_numpy()
+            user_ids = np.union1d(user_ids, liked[:, 0])
+            movie_ids = np.union1d(movie_ids, liked[:, 1])
+            spill.write(liked.astype(np.int64).tobytes())
+            n_pairs += len(liked)
+
+    # Second pass over the spill (not the CSV): swap IDs for dense codes in place.
+    pairs = np.memmap(spill_path, dtype=np.int64, mode="r+", shape=(n_pairs, 2))
+    for lo in range(0, n_pairs, chunksize):
+        block = pairs[lo:lo + chunksize]
+        block[:, 0] = np.searchsorted(user_ids, block[:, 0])
+        block[:, 1] = np.searchsorted(movie_ids, block[:, 1])
+    _fill_csr(pairs, (0, 1), len(user_ids), out_dir, "user", chunksize)
+    _fill_csr(pairs, (1, 0), len(movie_ids), out_dir, "item", chunksize)
+    np.save(os.path.join(out_dir, "movie_ids.npy"), movie_ids)
+    np.save(os.path.join(out_dir, "user_ids.npy"), user_ids)
+    del pairs
+    os.unlink(spill_path)
+    return out_dir
+
+
+def open_cooccurrence_store(
+    ratings_path: Optional[str] = None,
+    ratings_df: Optional[pd.DataFrame] = None,
+) -> CooccurrenceIndex:
+    """Open the on-disk liked-matrix store for ratings_path read-only via np.load(mmap_mode="r").
+
+    The store lives in .cache/ next to the CSV, keyed like the CSV cache, and is built on
+    first use. Every process that opens it shares one page-cache copy of the CSR arrays.
+    """
+    rp = ratings_path or _data_path("ratings.csv")
+    store_dir = _frame_cache_dir(rp, "liked")
+    if not os.path.exists(os.path.join(store_dir, "movie_ids.npy")):
+        parent = os.path.dirname(store_dir)
+        os.makedirs(parent, exist_ok=True)
+        _prune_frame_caches(rp)
+        tmp_dir = tempfile.mkdtemp(dir=parent)
+        try:
+            if ratings_df is None:
+                build_cooccurrence_store(rp, tmp_dir)
+            else:
+                CooccurrenceIndex.from_ratings(ratings_df).save(tmp_dir)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        _publish_dir(tmp_dir, store_dir)
+    return CooccurrenceIndex.load(store_dir, mmap_mode="r")
 
 
 def find_similar_movies(
@@ -119,36 +1655,535 @@ def find_similar_movies(
     movies_df: pd.DataFrame,
     ratings_df: pd.DataFrame,
     min_fraction: float = 0.10,
+    index: Optional[CooccurrenceIndex] = None,
+) -> pd.DataFrame:
+    """Recommend movies based on users who liked this movie (collaborative filtering).
+
+    Without index, the CooccurrenceIndex built from ratings_df is reused for as long as
+    ratings_df is alive and has the same shape. After editing ratings in place without
+    adding or dropping rows, pass a new frame (or an index) to see the change.
+    """
+    with TRACER.trace("cf.find_similar") as trace:
+        if index is None:
+            index = get_cooccurrence_index(ratings_df)
+            trace.mark("index")
+        similar = index.similar(movie_id, min_fraction)
+        trace.mark("similar", len(similar))
+        rec = _rank_similar(similar)
+        trace.mark("rank", len(rec))
+        if rec.empty:
+            return pd.DataFrame(columns=["score", "similar", "all", "movieId", "title", "genres"])
+        rec = _attach_titles(rec, movies_df)
+        trace.mark("titles", len(rec))
+        return rec
+
+
+def find_similar_movies_batch(
+    movie_ids,
+    movies_df: pd.DataFrame,
+    ratings_df: pd.DataFrame,
+    min_fraction: float = 0.10,
+    index: Optional[CooccurrenceIndex] = None,
+    top_n: int = 20,
+) -> pd.DataFrame:
+    """find_similar_movies for many seeds with one pass of sparse products.
+
+    Returns a long frame: seedId plus find_similar_movies' columns, each distinct seed's
+    recommendations ranked as find_similar_movies ranks them, seeds in first-seen order.
+    """
+    with TRACER.trace("cf.find_similar_batch") as trace:
+        if index is None:
+            index = get_cooccurrence_index(ratings_df)
+            trace.mark("index")
+        similar = index.similar_batch(movie_ids, min_fraction)
+        trace.mark("similar", len(similar))
+        if similar.empty:
+            return pd.DataFrame(columns=["seedId", "score", "similar", "all", "movieId", "title", "genres"])
+        seed_pos = pd.factorize(similar["seedId"])[0]
+        sim = similar["similar"].to_numpy(dtype=float)
+        all_frac = similar["all"].to_numpy(dtype=float)
+        score = np.divide(sim, all_frac, out=np.zeros_like(sim), where=all_frac > 0)
+        movie_ids = similar["movieId"].to_numpy()
+        top = _rank_rows(seed_pos, movie_ids, score, top_n)
+        rec = pd.DataFrame({
+            "seedId": similar["seedId"].to_numpy()[top],
+            "score": score[top],
+            "similar": sim[top],
+            "all": all_frac[top],
+            "movieId": movie_ids[top],
+        })
+        trace.mark("rank", len(rec))
+        rec = _attach_titles(rec, movies_df)
+        trace.mark("titles", len(rec))
+        return rec
+
+
+def _group_by_user(ratings_df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(sorted userIds, their row-range bounds, row order) so one user's rows are a slice."""
+    users = ratings_df["userId"].to_numpy()
+    order = np.argsort(users, kind="stable")
+    ids, starts = np.unique(users[order], return_index=True)
+    return ids, np.append(starts, len(order)), order
+
+
+def _user_history(ratings_df: pd.DataFrame, user_id: int) -> Tuple[np.ndarray, np.ndarray]:
+    """movieIds and ratings of user_id in ratings_df; rows are grouped by user once per frame."""
+    ids, bounds, order = _cached_for_frame(ratings_df, "user_rows", _group_by_user)
+    pos = int(np.searchsorted(ids, user_id))
+    if pos == len(ids) or ids[pos] != user_id:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    rows = order[bounds[pos]:bounds[pos + 1]]
+    return ratings_df["movieId"].to_numpy()[rows], ratings_df["rating"].to_numpy(dtype=float)[rows]
+
+
+def recommend_for_user(
+    user,
+    movies_df: pd.DataFrame,
+    ratings_df: Optional[pd.DataFrame],
+    min_fraction: float = 0.10,
+    index: Optional[CooccurrenceIndex] = None,
+    top_n: int = 20,
 ) -> pd.DataFrame:
-    """Recommend movies based on users who liked this movie (collaborative filtering)."""
-    similar_users = ratings_df.loc[
-        (ratings_df["movieId"] == movie_id) & (ratings_df["rating"] >= 4), "userId"
-    ].unique()
-    if len(similar_users) == 0:
-        return pd.DataFrame(columns=["score", "similar", "all", "movieId", "title", "genres"])
-
-    sim_recs = ratings_df.loc[
-        ratings_df["userId"].isin(similar_users) & (ratings_df["rating"] >= 4), "movieId"
-    ]
-    if sim_recs.empty:
-        return pd.DataFrame(columns=["score", "similar", "all", "movieId", "title", "genres"])
-    sim_frac = sim_recs.value_counts() / len(similar_users)
-    sim_frac = sim_frac[sim_frac > min_fraction]
-    if sim_frac.empty:
-        return pd.DataFrame(columns=["score", "similar", "all", "movieId", "title", "genres"])
-
-    all_recs = ratings_df.loc[
-        ratings_df["movieId"].isin(sim_frac.index) & (ratings_df["rating"] >= 4)
-    ]
-    num_all = all_recs["userId"].nunique()
-    if num_all == 0:
-        return pd.DataFrame(columns=["score", "similar", "all", "movieId", "title", "genres"])
-    all_frac = all_recs["movieId"].value_counts() / num_all
-
-    rec = pd.concat([sim_frac, all_frac], axis=1).fillna(0)
-    rec.columns = ["similar", "all"]
-    rec["score"] = rec.apply(lambda r: r["similar"] / r["all"] if r["all"] > 0 else 0, axis=1)
-    rec = rec.replace([np.inf, -np.inf], 0).sort_values("score", ascending=False).head(20)
-    rec = rec.reset_index().rename(columns={"index": "movieId"})
-    rec = rec.merge(movies_df, on="movieId", how="left")
-    return rec[["score", "similar", "all", "movieId", "title", "genres"]]
+    """Personalized recommendations from a rating history, ranked by aggregated lift.
+
+    user is a userId, whose history comes from ratings_df plus the likes the CF index holds
+    for them (appended ratings included), or an iterable of (movieId, rating) pairs. Movies
+    rated 4 or more are the seeds for CooccurrenceIndex.recommend; every rated movie is
+    excluded. Columns match find_similar_movies.
+    """
+    with TRACER.trace("cf.recommend_for_user") as trace:
+        if index is None:
+            index = get_cooccurrence_index(ratings_df)
+            trace.mark("index")
+        if isinstance(user, (int, np.integer)):
+            if ratings_df is not None:
+                movie_ids, ratings = _user_history(ratings_df, int(user))
+            else:
+                movie_ids, ratings = np.empty(0, dtype=np.int64), np.empty(0)
+            liked = np.concatenate([movie_ids[ratings >= index.LIKED_THRESHOLD], index.user_likes(int(user))])
+            seen = np.concatenate([movie_ids, liked])
+        else:
+            history = np.asarray(list(user), dtype=float).reshape(-1, 2)
+            seen = history[:, 0].astype(np.int64)
+            liked = seen[history[:, 1] >= index.LIKED_THRESHOLD]
+        trace.mark("history", len(seen))
+        rec = _rank_similar(index.recommend(liked, seen, min_fraction), top_n)
+        trace.mark("rank", len(rec))
+        if rec.empty:
+            return pd.DataFrame(columns=["score", "similar", "all", "movieId", "title", "genres"])
+        rec = _attach_titles(rec, movies_df)
+        trace.mark("titles", len(rec))
+        return rec
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k largest scores, descending; ties keep ascending position like a stable sort."""
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if len(scores) > k:
+        kth = scores[np.argpartition(scores, len(scores) - k)[len(scores) - k]]
+        candidates = np.flatnonzero(scores >= kth)
+    else:
+        candidates = np.arange(len(scores))
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order[:k]]
+
+
+def _rank_similar(rec: pd.DataFrame, top_n: int = 20) -> pd.DataFrame:
+    """Add the lift score (similar / all) to CooccurrenceIndex.similar output and keep the top_n."""
+    if rec.empty:
+        return pd.DataFrame(columns=["score", "similar", "all", "movieId"])
+    similar = rec["similar"].to_numpy()
+    all_frac = rec["all"].to_numpy()
+    score = np.divide(similar, all_frac, out=np.zeros_like(similar), where=all_frac > 0)
+    top = _top_k(score, top_n)
+    return pd.DataFrame({
+        "score": score[top],
+        "similar": similar[top],
+        "all": all_frac[top],
+        "movieId": rec.index.to_numpy()[top],
+    })
+
+
+_WORKER_INDEX: Optional[CooccurrenceIndex] = None
+
+
+def _init_precompute_worker(index_dir: str) -> None:
+    global _WORKER_INDEX
+    _WORKER_INDEX = CooccurrenceIndex.load(index_dir, mmap_mode="r")
+
+
+def _precompute_shard(movie_ids: np.ndarray, min_fraction: float, top_n: int) -> pd.DataFrame:
+    frames = []
+    for movie_id in movie_ids:
+        rec = _rank_similar(_WORKER_INDEX.similar(int(movie_id), min_fraction), top_n)
+        if not rec.empty:
+            rec.insert(0, "seedId", int(movie_id))
+            frames.append(rec)
+    if not frames:
+        return pd.DataFrame(columns=["seedId", "score", "similar", "all", "movieId"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def precompute_recommendations(
+    ratings_df: pd.DataFrame,
+    output_path: str,
+    min_fraction: float = 0.10,
+    top_n: int = 20,
+    workers: Optional[int] = None,
+    shard_size: int = 256,
+) -> str:
+    """Materialize find_similar_movies for every liked movie into one .npz table.
+
+    Movie IDs are sharded across a process pool; workers memory-map the CSR arrays of a
+    CooccurrenceIndex written to a temp dir instead of receiving a pickled copy per task.
+    """
+    index = get_cooccurrence_index(ratings_df)
+    seeds = np.asarray(index.movie_ids)
+    shards = [seeds[i:i + shard_size] for i in range(0, len(seeds), shard_size)]
+    with tempfile.TemporaryDirectory() as index_dir:
+        index.save(index_dir)
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_precompute_worker, initargs=(index_dir,)
+        ) as pool:
+            parts = list(pool.map(_precompute_shard, shards, repeat(min_fraction), repeat(top_n)))
+    table = pd.concat(parts, ignore_index=True) if parts else _precompute_shard(np.array([]), min_fraction, top_n)
+
+    seed_ids, starts = np.unique(table["seedId"].to_numpy(dtype=np.int64), return_index=True)
+    offsets = np.append(starts, len(table)).astype(np.int64)
+    out_dir = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(out_dir, exist_ok=True)
+    with open(output_path, "wb") as fh:
+        np.savez_compressed(
+            fh,
+            seed_ids=seed_ids,
+            offsets=offsets,
+            movie_ids=table["movieId"].to_numpy(dtype=np.int64),
+            score=table["score"].to_numpy(dtype=np.float64),
+            similar=table["similar"].to_numpy(dtype=np.float64),
+            all=table["all"].to_numpy(dtype=np.float64),
+            min_fraction=np.float64(min_fraction),
+        )
+    return output_path
+
+
+class PrecomputedRecommendations:
+    """Serve find_similar_movies results from a table written by precompute_recommendations."""
+
+    def __init__(self, path: str):
+        with np.load(path) as data:
+            self.movie_ids = data["movie_ids"]
+            self.score = data["score"]
+            self.similar = data["similar"]
+            self.all = data["all"]
+            self.min_fraction = float(data["min_fraction"])
+            offsets = data["offsets"]
+            self._slices = {
+                int(seed): (int(offsets[i]), int(offsets[i + 1]))
+                for i, seed in enumerate(data["seed_ids"])
+            }
+
+    def __contains__(self, movie_id: int) -> bool:
+        return int(movie_id) in self._slices
+
+    def get(self, movie_id: int, movies_df: pd.DataFrame) -> pd.DataFrame:
+        """Return the precomputed recommendations for movie_id in find_similar_movies format."""
+        span = self._slices.get(int(movie_id))
+        if span is None:
+            return pd.DataFrame(columns=["score", "similar", "all", "movieId", "title", "genres"])
+        lo, hi = span
+        rec = pd.DataFrame({
+            "score": self.score[lo:hi],
+            "similar": self.similar[lo:hi],
+            "all": self.all[lo:hi],
+            "movieId": self.movie_ids[lo:hi],
+        })
+        return _attach_titles(rec, movies_df)
+
+
+def _approx_nbytes(value) -> int:
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by entry count and approximate memory, with hit/miss counters.
+
+    check_version(v) drops every entry when the data version the results were computed
+    from changes, so stale results are never served after an update. With ttl (seconds)
+    entries also expire that long after they were stored.
+    """
+
+    def __init__(self, maxsize: int = 1024, max_bytes: int = 64 << 20, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data: "OrderedDict[object, Tuple[object, int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[2] > self.ttl:
+                del self._data[key]
+                self._bytes -= entry[1]
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value) -> None:
+        size = _approx_nbytes(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[key] = (value, size, time.monotonic())
+            self._bytes += size
+            while len(self._data) > self.maxsize or self._bytes > self.max_bytes:
+                _, (_, evicted, _) = self._data.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def check_version(self, version) -> None:
+        """Clear the cache if version differs from the one its entries were computed against."""
+        if version == self._version:
+            return
+        with self._lock:
+            if version != self._version:
+                self._data.clear()
+                self._bytes = 0
+                self._version = version
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+SEARCH_SCORE_BUCKET = 0.05
+
+
+class RecommenderEngine:
+    """Everything the app serves from, built once per process and shared by all sessions.
+
+    Holds the movies and ratings frames, the TF-IDF vectorizer and title matrix, the
+    fuzzy/prefix search indexes and the collaborative-filtering index. Nothing is
+    copied per call, so it is meant to live in a resource cache (st.cache_resource).
+    """
+
+    def __init__(
+        self,
+        movies: pd.DataFrame,
+        ratings: pd.DataFrame,
+        vectorizer: TfidfVectorizer,
+        vectors,
+        cooccurrence: Optional[CooccurrenceIndex] = None,
+    ):
+        if "clean_title" not in movies.columns:
+            movies = movies.assign(clean_title=clean_titles(movies["title"]))
+        self.movies = movies
+        self.ratings = ratings
+        self.vectorizer = vectorizer
+        self.vectors = vectors
+        # TF-IDF search scans the posting lists: title posting lists are short enough that
+        # TitleIndex's pruning does not pay for its bookkeeping. Assign one to opt in.
+        self.title_index: Optional[TitleIndex] = None
+        self.trigram_index = TrigramIndex(movies["clean_title"])
+        self.prefix_index = build_prefix_index(movies, ratings)
+        self.cooccurrence = cooccurrence if cooccurrence is not None else get_cooccurrence_index(ratings)
+        self.recommendation_cache = LRUCache(maxsize=4096, max_bytes=64 << 20)
+        self.search_cache = LRUCache(maxsize=8192, max_bytes=32 << 20, ttl=3600)
+        self.scale = "small"
+
+    @classmethod
+    def load(
+        cls,
+        movies_path: Optional[str] = None,
+        ratings_path: Optional[str] = None,
+        auto_download: bool = True,
+        dataset: Optional[str] = None,
+        scale: str = "auto",
+    ) -> "RecommenderEngine":
+        """Load a dataset with the persisted TF-IDF artifact and the CF index.
+
+        scale="large" loads compact ratings (no timestamps) and serves CF from the
+        memory-mapped liked-matrix store; "small" keeps everything in process memory;
+        "auto" picks "large" once the ratings count reaches LARGE_DATASET_RATINGS.
+        """
+        if scale not in ("auto", "small", "large"):
+            raise ValueError(f"Unknown scale: {scale!r}")
+        mp, rp = resolve_data_paths(movies_path, ratings_path, auto_download, dataset)
+        if scale == "auto":
+            scale = "large" if count_ratings(rp) >= LARGE_DATASET_RATINGS else "small"
+        large = scale == "large"
+        movies, ratings = load_data(mp, rp, auto_download=False, compact=large, keep_timestamp=not large)
+        movies = movies.assign(clean_title=clean_titles(movies["title"]))
+        vectorizer, vectors = load_or_build_tfidf(movies, mp)
+        # Large datasets build the store by streaming the CSV rather than from the loaded frame.
+        cooccurrence = open_cooccurrence_store(rp) if large else None
+        engine = cls(movies, ratings, vectorizer, vectors, cooccurrence)
+        engine.scale = scale
+        return engine
+
+    def search(self, query: str, top_n: int = 10, min_score: float = 0.2, mode: str = "tfidf") -> pd.DataFrame:
+        """search_movie against this engine's indexes, cached on the normalized query.
+
+        Results are cached per min_score bucket (computed at the bucket's lower edge) and
+        filtered to the exact min_score on the way out, which yields the same rows.
+        """
+        name = clean_title(query).strip()
+        bucket = math.floor(min_score / SEARCH_SCORE_BUCKET) * SEARCH_SCORE_BUCKET
+        key = (name, int(top_n), round(bucket, 6), mode)
+        out = self.search_cache.get(key)
+        if out is None:
+            out = search_movie(
+                name, self.movies, self.vectorizer, self.vectors, top_n=top_n, min_score=bucket,
+                index=self.title_index, mode=mode, fuzzy_index=self.trigram_index,
+            )
+            self.search_cache.put(key, out)
+        if out.empty:
+            return out.copy()
+        return out[out["_score"] >= min_score].copy()
+
+    def search_batch(self, queries, top_n: int = 10, min_score: float = 0.2) -> pd.DataFrame:
+        """search_movies_batch against this engine's title matrix (uncached)."""
+        return search_movies_batch(queries, self.movies, self.vectorizer, self.vectors, top_n, min_score)
+
+    def recommend_for_user(self, user, top_n: int = 20, min_fraction: float = 0.10) -> pd.DataFrame:
+        """recommend_for_user against this engine's ratings and CF index (uncached)."""
+        return recommend_for_user(user, self.movies, self.ratings, min_fraction, index=self.cooccurrence, top_n=top_n)
+
+    def append_ratings(self, ratings_df: pd.DataFrame) -> int:
+        """Add new ratings to the CF index in place; similar() reflects them on the next call.
+
+        self.ratings stays the load-time frame; the CF index (and so every recommendation)
+        sees the appended likes. Returns the number of liked rows taken in.
+        """
+        return self.cooccurrence.append_ratings(ratings_df)
+
+    def similar_batch(self, movie_ids, min_fraction: float = 0.10) -> pd.DataFrame:
+        """similar() for many seeds as one long frame with a seedId column.
+
+        Seeds already in the recommendation cache are served from it; the rest are computed
+        together with find_similar_movies_batch and cached one entry per seed.
+        """
+        version = self.cooccurrence.version
+        self.recommendation_cache.check_version(version)
+        seeds = pd.unique(np.asarray(movie_ids, dtype=np.int64).ravel())
+        recs = {int(m): self.recommendation_cache.get((version, int(m), float(min_fraction))) for m in seeds}
+        missing = [m for m, rec in recs.items() if rec is None]
+        if missing:
+            batch = find_similar_movies_batch(
+                missing, self.movies, self.ratings, min_fraction, index=self.cooccurrence
+            )
+            groups = {int(m): g for m, g in batch.groupby("seedId", sort=False)}
+            for m in missing:
+                if m in groups:
+                    rec = groups[m].drop(columns="seedId").reset_index(drop=True)
+                else:
+                    rec = pd.DataFrame(columns=["score", "similar", "all", "movieId", "title", "genres"])
+                self.recommendation_cache.put((version, m, float(min_fraction)), rec)
+                recs[m] = rec
+        frames = [rec.assign(seedId=m) for m, rec in recs.items() if not rec.empty]
+        if not frames:
+            return pd.DataFrame(columns=["seedId", "score", "similar", "all", "movieId", "title", "genres"])
+        out = pd.concat(frames, ignore_index=True)
+        return out[["seedId"] + [c for c in out.columns if c != "seedId"]]
+
+    def cache_stats(self) -> Dict[str, Dict[str, float]]:
+        """Hit/miss statistics of the search and recommendation result caches."""
+        return {"search": self.search_cache.stats(), "recommendations": self.recommendation_cache.stats()}
+
+    def suggest(self, prefix: str, k: int = 10) -> List[str]:
+        """Autocomplete titles for prefix, most popular first."""
+        return self.prefix_index.suggest(prefix, k)
+
+    def similar(self, movie_id: int, min_fraction: float = 0.10) -> pd.DataFrame:
+        """find_similar_movies against this engine's CF index, cached per (movieId, min_fraction).
+
+        Keys carry the CF index version read before computing, so a result that raced an
+        append_ratings is stored under the old version and never served for the new one.
+        """
+        version = self.cooccurrence.version
+        self.recommendation_cache.check_version(version)
+        key = (version, int(movie_id), float(min_fraction))
+        rec = self.recommendation_cache.get(key)
+        if rec is None:
+            rec = find_similar_movies(movie_id, self.movies, self.ratings, min_fraction, index=self.cooccurrence)
+            self.recommendation_cache.put(key, rec)
+        return rec.copy()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m recommender")
+    sub = parser.add_subparsers(dest="command", required=True)
+    pre = sub.add_parser("precompute", help="materialize top-N recommendations for every movie")
+    pre.add_argument("--dataset", choices=sorted(DATASETS), help="MovieLens variant (default: $CINEMATCH_DATASET)")
+    pre.add_argument("--movies", help="path to movies.csv")
+    pre.add_argument("--ratings", help="path to ratings.csv")
+    pre.add_argument("--output", help="output .npz (default: recommendations.npz in the dataset dir)")
+    pre.add_argument("--min-fraction", type=float, default=0.10)
+    pre.add_argument("--top-n", type=int, default=20)
+    pre.add_argument("--workers", type=int, default=None)
+    store = sub.add_parser("build-store", help="stream ratings.csv into the memory-mapped liked-matrix store")
+    store.add_argument("--dataset", choices=sorted(DATASETS), help="MovieLens variant (default: $CINEMATCH_DATASET)")
+    store.add_argument("--ratings", help="path to ratings.csv")
+    tfidf = sub.add_parser("build-tfidf", help="build the persisted TF-IDF artifact for movies.csv")
+    tfidf.add_argument("--dataset", choices=sorted(DATASETS), help="MovieLens variant (default: $CINEMATCH_DATASET)")
+    tfidf.add_argument("--movies", help="path to movies.csv")
+    args = parser.parse_args(argv)
+
+    if args.command == "precompute":
+        mp, rp = resolve_data_paths(args.movies, args.ratings, dataset=args.dataset)
+        _, ratings = load_data(mp, rp, compact=True, keep_timestamp=False)
+        output = args.output or os.path.join(os.path.dirname(os.path.abspath(rp)), "recommendations.npz")
+        path = precompute_recommendations(
+            ratings, output, min_fraction=args.min_fraction, top_n=args.top_n, workers=args.workers
+        )
+        print(f"Wrote {path}")
+    elif args.command == "build-store":
+        rp = args.ratings or resolve_data_paths(dataset=args.dataset)[1]
+        index = open_cooccurrence_store(rp)
+        print(f"Liked-matrix store ready: {index.user_items.shape[0]} users x {index.user_items.shape[1]} movies")
+    elif args.command == "build-tfidf":
+        mp = args.movies or resolve_data_paths(dataset=args.dataset)[0]
+        movies = pd.read_csv(mp)
+        _, vectors = load_or_build_tfidf(movies, mp)
+        print(f"TF-IDF artifact ready: {vectors.shape[0]} titles x {vectors.shape[1]} terms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,69 @@
+"""The streamed liked-matrix store must answer exactly like the in-memory index."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import recommender as R
+
+
+@pytest.fixture(scope="module")
+def data(tmp_path_factory):
+    rng = np.random.default_rng(0)
+    n_users, n_movies, n_ratings = 300, 200, 12_000
+    movies = pd.DataFrame({
+        "movieId": np.arange(1, n_movies + 1) * 3,
+        "title": [f"Movie {i} ({1950 + i % 70})" for i in range(n_movies)],
+        "genres": "Drama",
+    })
+    popularity = 1.0 / np.arange(1, n_movies + 1)
+    ratings = pd.DataFrame({
+        "userId": rng.integers(1, n_users + 1, n_ratings),
+        "movieId": movies["movieId"].to_numpy()[rng.choice(n_movies, n_ratings, p=popularity / popularity.sum())],
+        "rating": rng.choice(np.arange(1, 11) / 2, n_ratings),
+        "timestamp": 0,
+    }).drop_duplicates(["userId", "movieId"])
+    # Repeated liked rows: the streamed store keeps them as separate entries.
+    liked = ratings[ratings["rating"] >= 4]
+    ratings = pd.concat([ratings, liked.sample(2_000, replace=True, random_state=1)], ignore_index=True)
+    path = tmp_path_factory.mktemp("store") / "ratings.csv"
+    ratings.to_csv(path, index=False)
+    store_dir = str(path.parent / "store")
+    R.build_cooccurrence_store(str(path), store_dir, chunksize=1_000)
+    return movies, ratings, R.CooccurrenceIndex.load(store_dir), R.CooccurrenceIndex.from_ratings(ratings)
+
+
+def _seeds(ratings, n=40):
+    return ratings.loc[ratings["rating"] >= 4, "movieId"].unique()[:n]
+
+
+def test_similar_matches(data):
+    movies, ratings, store, memory = data
+    for seed in _seeds(ratings):
+        pd.testing.assert_frame_equal(
+            R.find_similar_movies(int(seed), movies, ratings, index=store),
+            R.find_similar_movies(int(seed), movies, ratings, index=memory),
+            check_dtype=False,
+        )
+
+
+def test_similar_batch_matches(data):
+    movies, ratings, store, memory = data
+    seeds = _seeds(ratings)
+    batch = R.find_similar_movies_batch(seeds, movies, ratings, index=store)
+    pd.testing.assert_frame_equal(
+        batch, R.find_similar_movies_batch(seeds, movies, ratings, index=memory), check_dtype=False
+    )
+    for seed in seeds:
+        single = R.find_similar_movies(int(seed), movies, ratings, index=store)
+        part = batch[batch["seedId"] == seed].drop(columns="seedId").reset_index(drop=True)
+        pd.testing.assert_frame_equal(part, single, check_dtype=False)
+
+
+def test_recommend_for_user_matches(data):
+    movies, ratings, store, memory = data
+    for user in ratings["userId"].unique()[:50]:
+        pd.testing.assert_frame_equal(
+            R.recommend_for_user(int(user), movies, ratings, index=store),
+            R.recommend_for_user(int(user), movies, ratings, index=memory),
+            check_dtype=False,
+        )
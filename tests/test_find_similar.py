@@ -0,0 +1,87 @@
+"""find_similar_movies must give the scores and movies of the original pandas implementation."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import recommender as R
+
+
+def reference(movie_id, ratings_df, min_fraction=0.10):
+    """The pre-index implementation (score, similar, all indexed by movieId), before head(20)."""
+    liked = ratings_df[ratings_df["rating"] >= 4]
+    similar_users = liked.loc[liked["movieId"] == movie_id, "userId"].unique()
+    if len(similar_users) == 0:
+        return pd.DataFrame(columns=["similar", "all", "score"])
+    sim_frac = liked.loc[liked["userId"].isin(similar_users), "movieId"].value_counts() / len(similar_users)
+    sim_frac = sim_frac[sim_frac > min_fraction]
+    all_recs = liked[liked["movieId"].isin(sim_frac.index)]
+    all_frac = all_recs["movieId"].value_counts() / all_recs["userId"].nunique()
+    rec = pd.concat([sim_frac, all_frac], axis=1).fillna(0)
+    rec.columns = ["similar", "all"]
+    rec["score"] = rec["similar"] / rec["all"]
+    return rec
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(3)
+    n_movies = 150
+    movies = pd.DataFrame({
+        "movieId": np.arange(1, n_movies + 1) * 7,
+        "title": [f"Movie {i} (2000)" for i in range(n_movies)],
+        "genres": "Drama",
+    })
+    popularity = 1.0 / np.arange(1, n_movies + 1)
+    ratings = pd.DataFrame({
+        "userId": rng.integers(1, 250, 10_000),
+        "movieId": movies["movieId"].to_numpy()[rng.choice(n_movies, 10_000, p=popularity / popularity.sum())],
+        "rating": rng.choice(np.arange(1, 11) / 2, 10_000),
+    }).drop_duplicates(["userId", "movieId"], ignore_index=True)
+    return movies, ratings
+
+
+def test_matches_reference(data):
+    movies, ratings = data
+    for movie_id in movies["movieId"].to_numpy()[::3]:
+        got = R.find_similar_movies(int(movie_id), movies, ratings)
+        want = reference(movie_id, ratings)
+        assert len(got) == min(20, len(want))
+        if got.empty:
+            continue
+        # Ties at the cut-off were in undefined order before, so compare the ranked scores
+        # and the movies strictly above the lowest score kept.
+        expected = np.sort(want["score"].to_numpy())[::-1][:20]
+        np.testing.assert_allclose(got["score"].to_numpy(float), expected)
+        cutoff = expected[-1]
+        assert set(got.loc[got["score"] > cutoff, "movieId"]) == set(want.index[want["score"] > cutoff])
+        rows = want.loc[got["movieId"]]
+        np.testing.assert_allclose(got["similar"].to_numpy(float), rows["similar"].to_numpy())
+        np.testing.assert_allclose(got["all"].to_numpy(float), rows["all"].to_numpy())
+
+
+def test_rebuilds_after_rows_added(data):
+    movies, ratings = data
+    ratings = ratings.copy()
+    seed = int(movies["movieId"].iloc[0])
+    before = R.find_similar_movies(seed, movies, ratings)
+    new_movie = int(movies["movieId"].iloc[-1])
+    for user in range(1000, 1100):
+        ratings.loc[len(ratings)] = [user, seed, 5.0]
+        ratings.loc[len(ratings)] = [user, new_movie, 5.0]
+    after = R.find_similar_movies(seed, movies, ratings)
+    assert new_movie not in set(before["movieId"])
+    assert new_movie in set(after["movieId"])
+
+
+def test_compact_ratings_give_identical_frames(data):
+    movies, ratings = data
+    compact = ratings.astype({"userId": np.int32, "movieId": np.int32, "rating": np.float16})
+    users = ratings["userId"].unique()[:5]
+    for movie_id in movies["movieId"].to_numpy()[:10]:
+        pd.testing.assert_frame_equal(
+            R.find_similar_movies(int(movie_id), movies, compact), R.find_similar_movies(int(movie_id), movies, ratings)
+        )
+    for user in users:
+        pd.testing.assert_frame_equal(
+            R.recommend_for_user(int(user), movies, compact), R.recommend_for_user(int(user), movies, ratings)
+        )
@@ -0,0 +1,25 @@
+"""TitleIndex's pruned top-k must return exactly what the posting-list scan returns."""
+import numpy as np
+import pandas as pd
+
+import recommender as R
+
+WORDS = ["matrix", "star", "wars", "night", "day", "love", "city", "dark", "knight", "return", "1999", "zzz"]
+
+
+def test_matches_scan():
+    rng = np.random.default_rng(0)
+    titles = [" ".join(rng.choice(WORDS[:-1], rng.integers(1, 5))) + f" ({rng.integers(1950, 2020)})" for _ in range(3_000)]
+    movies = pd.DataFrame({"movieId": np.arange(len(titles)), "title": titles, "genres": "Drama"})
+    movies = movies.assign(clean_title=R.clean_titles(movies["title"]))
+    vectorizer, vectors = R.build_vectorizer(movies["clean_title"])
+    index = R.TitleIndex(vectorizer, vectors)
+    assert index.rows is vectors.indices
+    for _ in range(60):
+        query = " ".join(rng.choice(WORDS, rng.integers(1, 5)))
+        for top_n in (1, 10, 50):
+            for min_score in (0.0, 0.2, 0.5):
+                scan = R.search_movie(query, movies, vectorizer, vectors, top_n, min_score)
+                pruned = R.search_movie(query, movies, vectorizer, vectors, top_n, min_score, index=index)
+                assert list(pruned["movieId"]) == list(scan["movieId"])
+                np.testing.assert_array_equal(pruned["_score"].to_numpy(float), scan["_score"].to_numpy(float))
@@ -0,0 +1,47 @@
+"""top_n=0 asks for no rows: every search and ranking path returns an empty frame."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import recommender as R
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    movies = pd.DataFrame({
+        "movieId": np.arange(1, 101),
+        "title": [f"The Matrix {i} ({1950 + i})" if i % 5 == 0 else f"Night {i} ({1950 + i})" for i in range(100)],
+        "genres": "Drama",
+    })
+    ratings = pd.DataFrame({
+        "userId": rng.integers(1, 60, 3_000),
+        "movieId": rng.integers(1, 101, 3_000),
+        "rating": 4.5,
+    }).drop_duplicates(["userId", "movieId"])
+    movies = movies.assign(clean_title=R.clean_titles(movies["title"]))
+    vectorizer, vectors = R.build_vectorizer(movies["clean_title"])
+    return movies, ratings, vectorizer, vectors
+
+
+def test_top_k_zero():
+    assert R._top_k(np.array([0.5, 0.9, 0.1]), 0).size == 0
+    assert list(R._top_k(np.array([0.5, 0.9, 0.1]), 2)) == [1, 0]
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"mode": "fuzzy"}, {"index": "title_index"}])
+def test_search_movie_top_n_zero(data, kwargs):
+    movies, _, vectorizer, vectors = data
+    if kwargs.get("index") == "title_index":
+        kwargs = {"index": R.TitleIndex(vectorizer, vectors)}
+    assert not R.search_movie("matrix", movies, vectorizer, vectors, **kwargs).empty
+    assert R.search_movie("matrix", movies, vectorizer, vectors, top_n=0, **kwargs).empty
+
+
+def test_recommendations_top_n_zero(data):
+    movies, ratings, _, _ = data
+    index = R.CooccurrenceIndex.from_ratings(ratings)
+    user = int(ratings["userId"].iloc[0])
+    assert not R.recommend_for_user(user, movies, ratings, index=index).empty
+    assert R.recommend_for_user(user, movies, ratings, index=index, top_n=0).empty
+    assert R.find_similar_movies_batch([1, 2], movies, ratings, index=index, top_n=0).empty